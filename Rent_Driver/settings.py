@@ -1,3 +1,5 @@
+import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 
@@ -6,8 +8,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = "django-insecure-g^%t33=v(zbnm3rrjre0$rsl7)p6q1b#l-)e*=&gfc=d1@s**!"
 
-# ⚠️ Turn DEBUG=False in production
-DEBUG = True  
+# ⚠️ Turn DEBUG=False in production: RENT_DRIVER_DEBUG=0
+DEBUG = os.environ.get("RENT_DRIVER_DEBUG", "1") != "0"
 
 ALLOWED_HOSTS = ["*"]  # 👉 allow all hosts for now (update in production)
 
@@ -45,13 +47,20 @@ TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [BASE_DIR / "core" / "templates"],  # ✅ points to templates folder
-        "APP_DIRS": True,
         "OPTIONS": {
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
             ],
+            # Compile each template once per process; with DEBUG the
+            # autoreloader still clears it when a template file changes
+            "loaders": [
+                ("django.template.loaders.cached.Loader", [
+                    "django.template.loaders.filesystem.Loader",
+                    "django.template.loaders.app_directories.Loader",
+                ]),
+            ],
         },
     },
 ]
@@ -62,13 +71,126 @@ WSGI_APPLICATION = "Rent_Driver.wsgi.application"
 
 
 # ---------- Database ----------
+# Tests run on a file, not SQLite's shared in-memory database, so threaded
+# tests see real locking (waits) instead of "table is locked". The name is
+# unique per test run so concurrent runs on one host never share it; it is
+# kept in the environment so spawned parallel test workers agree on it.
+os.environ.setdefault(
+    "RENT_DRIVER_TEST_DB", os.path.join(tempfile.gettempdir(), f"rentadriver-test-{os.getpid()}.sqlite3")
+)
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        "TEST": {"NAME": os.environ["RENT_DRIVER_TEST_DB"]},
+    }
+}
+
+# Pick with RENT_DRIVER_DB_PROFILE=production. PRAGMAS are run on every new
+# SQLite connection (see core.signals); WAL lets readers and one writer work
+# side by side and busy_timeout makes writers wait instead of failing with
+# "database is locked". CONN_MAX_AGE keeps a connection per worker thread.
+DB_PROFILES = {
+    "default": {
+        "CONN_MAX_AGE": 0,
+        "PRAGMAS": {},
+    },
+    "production": {
+        "CONN_MAX_AGE": 600,
+        "PRAGMAS": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "mmap_size": 256 * 1024 * 1024,
+        },
+    },
+}
+DB_PROFILE = os.environ.get("RENT_DRIVER_DB_PROFILE", "default")
+DATABASES["default"]["CONN_MAX_AGE"] = DB_PROFILES[DB_PROFILE]["CONN_MAX_AGE"]
+DATABASES["default"]["CONN_HEALTH_CHECKS"] = DB_PROFILES[DB_PROFILE]["CONN_MAX_AGE"] > 0
+
+
+# ---------- Cache ----------
+# Local memory by default; point this at Redis/Memcached to share cached data
+# (leaderboard, ETag versions) between worker processes.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rent-driver",
     }
 }
 
+# {% cache %} fragments (navigation, footer, home page) go to their own
+# alias; rendered output is small and identical for many users.
+CACHES["template_fragments"] = {
+    "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    "LOCATION": "rent-driver-fragments",
+}
+
+# Sessions get their own alias so other cached data never evicts them.
+# RENT_DRIVER_REDIS_URL shares them between all workers; without it they
+# fall back to RENT_DRIVER_SESSION_CACHE: "locmem" (single process only)
+# or "file" (shared by the processes on this host).
+SESSION_CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rent-driver-sessions",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / ".cache" / "sessions",
+        "OPTIONS": {"MAX_ENTRIES": 100000},
+    },
+}
+if os.environ.get("RENT_DRIVER_REDIS_URL"):
+    CACHES["sessions"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["RENT_DRIVER_REDIS_URL"],
+    }
+else:
+    CACHES["sessions"] = SESSION_CACHE_BACKENDS[os.environ.get("RENT_DRIVER_SESSION_CACHE", "locmem")]
+
+# Live driver positions (LIVE_LOCATIONS below) get their own alias too, on
+# the same Redis when RENT_DRIVER_REDIS_URL is set.
+if os.environ.get("RENT_DRIVER_REDIS_URL"):
+    CACHES["live_locations"] = {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.environ["RENT_DRIVER_REDIS_URL"],
+        "KEY_PREFIX": "live",
+    }
+else:
+    CACHES["live_locations"] = {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "rent-driver-live-locations",
+    }
+
+
+# ---------- Sessions & messages ----------
+# RENT_DRIVER_SESSIONS picks the session store: "db" (default), "cache",
+# "cached_db" (cache reads, database write-through), "file" or
+# "signed_cookies" (no server-side storage at all). The cache based ones
+# use the "sessions" cache above; with "locmem" keep to one process.
+SESSION_BACKENDS = {
+    "db": "django.contrib.sessions.backends.db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "file": "django.contrib.sessions.backends.file",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_ENGINE = SESSION_BACKENDS[os.environ.get("RENT_DRIVER_SESSIONS", "db")]
+SESSION_CACHE_ALIAS = "sessions"
+
+# RENT_DRIVER_MESSAGES picks the flash message store. "fallback" (default)
+# keeps messages in a cookie and only writes the session when they do not
+# fit; "cookie" never touches the session but drops what does not fit.
+MESSAGE_BACKENDS = {
+    "cookie": "django.contrib.messages.storage.cookie.CookieStorage",
+    "fallback": "django.contrib.messages.storage.fallback.FallbackStorage",
+    "session": "django.contrib.messages.storage.session.SessionStorage",
+}
+MESSAGE_STORAGE = MESSAGE_BACKENDS[os.environ.get("RENT_DRIVER_MESSAGES", "fallback")]
+
 
 # ---------- Password Validators ----------
 AUTH_PASSWORD_VALIDATORS = [
@@ -94,9 +216,137 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploads over 512 KB are streamed to a temp file in chunks instead of held
+# in memory; core.images drops any file past IMAGES["MAX_UPLOAD_SIZE"] first.
+FILE_UPLOAD_MAX_MEMORY_SIZE = 512 * 1024
+FILE_UPLOAD_HANDLERS = [
+    "core.images.SizeLimitUploadHandler",
+    "django.core.files.uploadhandler.MemoryFileUploadHandler",
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+
 
 # ---------- Custom User ----------
 AUTH_USER_MODEL = "core.Account"
 
 
-# Session-based auth only; DRF/JWT removed for a simpler project
\ No newline at end of file
+# Session-based auth only; DRF/JWT removed for a simpler project
+
+
+# ---------- Geocoding ----------
+# PROVIDER is any core.geocoding.GeocodingProvider; use core.geocoding.StaticProvider
+# with OPTIONS={"results": {...}} to keep tests off the network.
+GEOCODING = {
+    "PROVIDER": "core.geocoding.NominatimProvider",
+    "OPTIONS": {"timeout": 5},
+    "TTL": timedelta(days=30),
+    "NEGATIVE_TTL": timedelta(days=1),
+    "MAX_ENTRIES": 1024,
+    # Geocode in a background thread after the response; False runs on commit in-request
+    "ASYNC": True,
+    "BATCH_SIZE": 50,
+}
+
+
+# ---------- Location ingestion ----------
+# Pings to /api/locations/ are buffered per user and flushed this often (seconds).
+# The driver dashboard pings every PING_INTERVAL seconds while the driver is
+# online; keep it well under LIVE_LOCATIONS["STALE_AFTER"].
+LOCATION_INGEST = {
+    "FLUSH_INTERVAL": 5,
+    "PING_INTERVAL": 60,
+}
+
+# Live driver positions served to nearby/suggest lookups instead of the
+# database; RENT_DRIVER_LIVE_LOCATIONS=0 turns this off. With
+# RENT_DRIVER_REDIS_URL set, BACKEND "cache" keeps them in the
+# "live_locations" alias above, which every worker shares. Without it,
+# BACKEND "local" keeps them per process; pings that reach another worker
+# show up here after at most REWARM_INTERVAL seconds, when the store
+# re-syncs from the database.
+LIVE_LOCATIONS = {
+    "ENABLED": os.environ.get("RENT_DRIVER_LIVE_LOCATIONS", "1") != "0",
+    "BACKEND": "cache" if os.environ.get("RENT_DRIVER_REDIS_URL") else "local",
+    "CACHE_ALIAS": "live_locations",
+    "STALE_AFTER": 600,
+    "REWARM_INTERVAL": 30,
+}
+
+
+# ---------- Geo queries ----------
+# "sql" computes distances in the database (SQLite via a registered
+# function, PostgreSQL natively) and returns only the nearest rows.
+GEO_QUERIES = {
+    "MODE": "python",
+}
+
+
+# ---------- Dispatch ----------
+# Used by `manage.py dispatch_rides`; MODE "optimal" needs scipy
+DISPATCH = {
+    "RADIUS_KM": 10,
+    "MAX_CANDIDATES": 20,
+    "MODE": "greedy",
+}
+
+
+# ---------- Leaderboard cache ----------
+# Rebuilt when a booking completes or a review changes; TTL caps staleness
+# for processes that do not share the cache.
+LEADERBOARD_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+    "LOCK_TIMEOUT": 30,
+}
+
+
+# ---------- Chat ----------
+# Long-poll requests wait up to POLL_TIMEOUT seconds for a new message;
+# pages of history (and the chat page's initial window) hold PAGE_SIZE.
+# Serve with an ASGI server (e.g. uvicorn Rent_Driver.asgi:application) so
+# waiting polls do not each hold a worker thread.
+CHAT = {
+    "POLL_TIMEOUT": 25,
+    "PAGE_SIZE": 50,
+}
+
+
+# ---------- Lookup cache ----------
+# Driver suggestions and nearby rides are reused for TTL seconds per user
+# and grid cell instead of being recomputed on every click.
+LOOKUP_CACHE = {
+    "CACHE_ALIAS": "default",
+    "TTL": 30,
+}
+
+
+# ---------- Pagination ----------
+# Dashboard ride, booking and review lists show PAGE_SIZE rows per page and
+# continue from an opaque cursor, so old pages cost the same as the first.
+PAGINATION = {
+    "PAGE_SIZE": 20,
+}
+
+
+# ---------- Conditional GET ----------
+# driver_dashboard, list_available_rides and list_driver_reviews answer 304
+# while the version counters of what they show are unchanged. Writes bump
+# the counters in this cache, so with several worker processes it must be a
+# shared one (e.g. Redis); a per-process locmem cache would serve stale 304s.
+CONDITIONAL_GET = {
+    "CACHE_ALIAS": "default",
+}
+
+
+# ---------- Images ----------
+# Profile pictures and review photos are checked on upload, then re-encoded
+# as WebP without metadata and given a thumbnail in a background thread
+# (ASYNC False does it on commit in-request). manage.py process_images
+# catches up on anything left unprocessed.
+IMAGES = {
+    "MAX_UPLOAD_SIZE": 8 * 1024 * 1024,
+    "MAX_PIXELS": 40_000_000,
+    "MAX_DIMENSION": 1600,
+    "QUALITY": 82,
+    "ASYNC": True,
+}
@@ -9,6 +9,9 @@ from .models import (
 	EmergencyAlert,
 	DriverReview,
 	ChatMessage,
+	DriverStats,
+	GeocodeCache,
+	RideOffer,
 )
 
 
@@ -59,6 +62,18 @@ class BookingAdmin(admin.ModelAdmin):
 	search_fields = ("driver__username", "ride_request__customer__username")
 
 
+@admin.register(RideOffer)
+class RideOfferAdmin(admin.ModelAdmin):
+	list_display = ("ride_request", "driver", "distance_km", "created_at")
+	search_fields = ("driver__username",)
+
+
+@admin.register(DriverStats)
+class DriverStatsAdmin(admin.ModelAdmin):
+	list_display = ("driver", "completed_count", "ongoing_count", "rating_sum", "rating_count")
+	search_fields = ("driver__username",)
+
+
 @admin.register(EmergencyContact)
 class EmergencyContactAdmin(admin.ModelAdmin):
 	list_display = ("user", "phone_number", "created_at")
@@ -82,4 +97,10 @@ class DriverReviewAdmin(admin.ModelAdmin):
 @admin.register(ChatMessage)
 class ChatMessageAdmin(admin.ModelAdmin):
 	list_display = ("booking", "sender", "text", "created_at")
-	search_fields = ("booking__id", "sender__username", "text")
\ No newline at end of file
+	search_fields = ("booking__id", "sender__username", "text")
+
+
+@admin.register(GeocodeCache)
+class GeocodeCacheAdmin(admin.ModelAdmin):
+	list_display = ("address_key", "lat", "lng", "expires_at")
+	search_fields = ("address_key",)
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""Read-only JSON API (v1) for the mobile app.
+
+Every endpoint answers GET with a compact JSON body plus an ETag; a client
+that sends the ETag back in If-None-Match gets an empty 304 while the data
+is unchanged. Authentication is the same session login as the web pages.
+"""
+import datetime
+import decimal
+import hashlib
+import json
+from functools import wraps
+
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .chat import access_error as chat_access_error, history, serialize_message
+from .geo import k_nearest_drivers, nearest_drivers
+from .leaderboard import cached_leaderboard_context
+from .models import Booking, RideRequest
+from .pagination import InvalidCursor, paginate
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; the stdlib encoder gives the same output, slower
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data, default=_default)
+    return json.dumps(data, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def json_response(request, data):
+    body = dumps(data)
+    response = HttpResponse(body, content_type="application/json")
+    response["ETag"] = quote_etag(hashlib.md5(body, usedforsecurity=False).hexdigest())
+    # Per-user data: only the client may keep it, and must revalidate first
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ["Cookie"])
+    return get_conditional_response(request, etag=response["ETag"], response=response)
+
+
+def api_view(view):
+    """GET-only, login required; the view returns plain data or an error response."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return HttpResponseNotAllowed(["GET", "HEAD"])
+        if not request.user.is_authenticated:
+            return JsonResponse({"error": "Authentication required."}, status=401)
+        result = view(request, *args, **kwargs)
+        if isinstance(result, HttpResponse):
+            return result
+        return json_response(request, result)
+    return wrapped
+
+
+def _page(request, queryset, field):
+    try:
+        return paginate(queryset, field, request.GET.get("after"))
+    except InvalidCursor:
+        return None
+
+
+# ---------- Endpoints ----------
+
+@api_view
+def nearby_drivers(request):
+    try:
+        lat = float(request.GET["lat"])
+        lng = float(request.GET["lng"])
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "lat and lng are required."}, status=400)
+    # Also false for nan and inf, which float() accepts (same check as parse_pings)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return JsonResponse({"error": "Coordinates out of range."}, status=400)
+    # Same fallback as the customer dashboard: nearest ones further out if none within 10 km
+    found = nearest_drivers(lat, lng, radius_km=10, limit=10) or k_nearest_drivers(lat, lng, k=10, radius_km=40)
+    return {"drivers": [{
+        "driver_id": d.user_id,
+        "username": d.user.username,
+        "vehicle": d.vehicle_details,
+        "distance_km": round(distance, 2),
+    } for d, distance in found]}
+
+
+@api_view
+def available_rides(request):
+    if request.user.role != "driver":
+        return JsonResponse({"error": "Only drivers can view available rides."}, status=403)
+    rides = (
+        RideRequest.objects.filter(status="pending", booking__isnull=True)
+        .values("id", "pickup_location", "dropoff_location", "pickup_lat", "pickup_lng", "created_at")
+    )
+    page = _page(request, rides, "created_at")
+    if page is None:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    rows, next_cursor = page
+    return {"rides": rows, "next": next_cursor}
+
+
+@api_view
+def bookings(request):
+    if request.user.role == "driver":
+        qs = Booking.objects.filter(driver=request.user)
+    else:
+        qs = Booking.objects.filter(ride_request__customer=request.user)
+    qs = qs.values(
+        "id", "status", "confirmed_at",
+        ride_id=F("ride_request_id"),
+        pickup_location=F("ride_request__pickup_location"),
+        dropoff_location=F("ride_request__dropoff_location"),
+        customer_username=F("ride_request__customer__username"),
+        driver_username=F("driver__username"),
+    )
+    page = _page(request, qs, "confirmed_at")
+    if page is None:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+    rows, next_cursor = page
+    return {"bookings": rows, "next": next_cursor}
+
+
+@api_view
+def chat_messages(request, booking_id):
+    booking = (
+        Booking.objects.select_related("ride_request")
+        .only("status", "driver_id", "ride_request__customer_id")
+        .filter(id=booking_id).first()
+    )
+    error = chat_access_error(booking, request.user)
+    if error:
+        return error
+    try:
+        after = int(request.GET["after"]) if "after" in request.GET else None
+        before = int(request.GET["before"]) if "before" in request.GET else None
+    except ValueError:
+        return JsonResponse({"error": "after and before must be message ids."}, status=400)
+    if after is not None and before is not None:
+        return JsonResponse({"error": "Give after or before, not both."}, status=400)
+    rows, has_more = history(booking.id, after=after, before=before)
+    return {"messages": [serialize_message(m) for m in rows], "has_more": has_more}
+
+
+@api_view
+def leaderboard(request):
+    return cached_leaderboard_context()
@@ -0,0 +1,25 @@
+from django.db import IntegrityError, transaction
+
+from .models import Booking, RideRequest
+
+
+def accept_ride(ride_request_id, driver):
+    """Atomically hand a pending ride to a driver.
+
+    Flipping the ride from pending to accepted is a single conditional
+    UPDATE, so when several drivers race for one ride exactly one of them
+    matches the row and gets the Booking. Everyone else gets None, meaning
+    the ride was already taken (or is no longer pending).
+    """
+    try:
+        with transaction.atomic():
+            # update() skips RideRequest.save(), so clear the pickup cell here too
+            claimed = RideRequest.objects.filter(id=ride_request_id, status="pending").update(
+                status="accepted", pickup_cell=""
+            )
+            if not claimed:
+                return None
+            return Booking.objects.create(ride_request_id=ride_request_id, driver=driver)
+    except IntegrityError:
+        # A booking already existed for a ride still marked pending
+        return None
@@ -0,0 +1,147 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.http import JsonResponse
+
+from .models import ChatMessage
+
+DEFAULTS = {
+    "POLL_TIMEOUT": 25,
+    "PAGE_SIZE": 50,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "CHAT", {}).get(name, DEFAULTS[name])
+
+
+def serialize_message(message):
+    return {
+        "id": message.id,
+        "sender": message.sender.username,
+        "text": message.text,
+        "created_at": message.created_at.isoformat(),
+    }
+
+
+# ---------- Access ----------
+
+def access_error(booking, user):
+    """JSON error response if the user cannot use this booking's chat, else None.
+
+    Shared by the chat views and the read-only API; booking may be None
+    (not found) and needs ride_request loaded.
+    """
+    if booking is None:
+        return JsonResponse({"error": "Booking not found."}, status=404)
+    if booking.ride_request.customer_id != user.pk and booking.driver_id != user.pk:
+        return JsonResponse({"error": "You are not allowed to view this chat."}, status=403)
+    if booking.status in ["completed", "cancelled"]:
+        return JsonResponse({"error": "Chat is unavailable for finalized rides."}, status=410)
+    return None
+
+
+# ---------- History ----------
+
+def history_query(booking_id, after=None, before=None, limit=None):
+    """Keyset page of a booking's messages on (created_at, id).
+
+    after/before are message ids: after returns the next messages oldest
+    first (after=0 starts at the beginning), before the previous ones newest
+    first, and neither the latest ones newest first. One extra row is
+    fetched so the caller can tell whether more exist; see split_page().
+    """
+    limit = limit or get_setting("PAGE_SIZE")
+    qs = ChatMessage.objects.filter(booking_id=booking_id).select_related("sender")
+    cursor = after or before
+    if cursor:
+        pivot = Subquery(ChatMessage.objects.filter(booking_id=booking_id, pk=cursor).values("created_at")[:1])
+        # A plain range on created_at keeps the index usable; ties are cut by id
+        if after:
+            qs = qs.filter(created_at__gte=pivot).exclude(created_at=pivot, id__lte=cursor)
+        else:
+            qs = qs.filter(created_at__lte=pivot).exclude(created_at=pivot, id__gte=cursor)
+    if after is not None:
+        return qs.order_by("created_at", "id")[:limit + 1]
+    return qs.order_by("-created_at", "-id")[:limit + 1]
+
+
+def split_page(rows, limit=None, newest_first=False):
+    """Trim the extra row from history_query(); returns (messages oldest first, has_more)."""
+    limit = limit or get_setting("PAGE_SIZE")
+    rows = list(rows)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if newest_first:
+        rows.reverse()
+    return rows, has_more
+
+
+def history(booking_id, after=None, before=None, limit=None):
+    rows = history_query(booking_id, after, before, limit)
+    return split_page(rows, limit, newest_first=after is None)
+
+
+async def ahistory(booking_id, after=None, before=None, limit=None):
+    rows = [m async for m in history_query(booking_id, after, before, limit)]
+    return split_page(rows, limit, newest_first=after is None)
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(True)
+
+
+# ---------- Live delivery ----------
+
+class ChatHub:
+    """In-process pub/sub of "new message" events keyed by booking id.
+
+    Long-poll requests subscribe, check the database, then wait; publish()
+    may be called from any thread (sync views, signals) and wakes every
+    waiter of that booking on its own event loop. Only one process is
+    covered: pollers in other workers notice new messages at their timeout.
+    """
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, booking_id):
+        loop = asyncio.get_running_loop()
+        waiter = (booking_id, loop, loop.create_future())
+        with self._lock:
+            self._waiters[booking_id].add(waiter)
+        return waiter
+
+    def unsubscribe(self, waiter):
+        with self._lock:
+            waiters = self._waiters.get(waiter[0])
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self._waiters[waiter[0]]
+
+    async def wait(self, waiter, timeout):
+        """Wait until the booking gets a new message; False on timeout."""
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter[2]), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def publish(self, booking_id):
+        with self._lock:
+            waiters = self._waiters.pop(booking_id, ())
+        for _, loop, future in waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_wake, future)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(w) for w in self._waiters.values())
+
+
+hub = ChatHub()
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+
+from . import etags
+from .geo import online_drivers
+from .locations import live_locations
+from .models import RideOffer, RideRequest
+from .utils import CELL_SIZE_DEG, KM_PER_DEG_LAT, batch_distances, bounding_box, cell_for, cells_in_box, np, top_k
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+except ImportError:  # scipy is only needed for the "optimal" mode
+    csr_matrix = min_weight_full_bipartite_matching = None
+
+DEFAULTS = {
+    "RADIUS_KM": 10,
+    "MAX_CANDIDATES": 20,
+    "MODE": "greedy",
+}
+
+MODES = ("greedy", "optimal")
+
+# Cost of leaving a ride unmatched in optimal mode; far above any real distance
+# so the solver matches as many rides as possible before minimizing distance.
+UNMATCHED_COST = 1e6
+
+
+def get_setting(name):
+    return getattr(settings, "DISPATCH", {}).get(name, DEFAULTS[name])
+
+
+# ---------- Matching ----------
+
+def candidate_pairs(rides, drivers, radius_km, max_candidates):
+    """Return (distance_km, ride_index, driver_index) for each ride's closest drivers.
+
+    rides and drivers are sequences of (id, lat, lng). Rides are grouped by
+    grid cell and the drivers around each cell are gathered once per group,
+    so each ride only measures nearby drivers. Only its max_candidates
+    closest drivers within radius_km are kept.
+    """
+    by_cell = defaultdict(list)
+    for j, (_, lat, lng) in enumerate(drivers):
+        by_cell[cell_for(lat, lng)].append(j)
+    rides_by_cell = defaultdict(list)
+    for i, (_, lat, lng) in enumerate(rides):
+        rides_by_cell[cell_for(lat, lng)].append(i)
+
+    # Any ride inside a cell is at most half a cell diagonal from its centre
+    reach_km = radius_km + CELL_SIZE_DEG * KM_PER_DEG_LAT * 0.71
+    pairs = []
+    for key, ride_idx in rides_by_cell.items():
+        row, col = map(int, key.split(":"))
+        centre = ((row + 0.5) * CELL_SIZE_DEG, (col + 0.5) * CELL_SIZE_DEG)
+        keys = cells_in_box(bounding_box(*centre, reach_km))
+        if keys is None:
+            keys = list(by_cell)
+        idx = list(chain.from_iterable(by_cell.get(k, ()) for k in keys))
+        if not idx:
+            continue
+        lats = [drivers[j][1] for j in idx]
+        lngs = [drivers[j][2] for j in idx]
+        if np is not None:
+            lats, lngs = np.asarray(lats), np.asarray(lngs)
+        for i in ride_idx:
+            _, lat, lng = rides[i]
+            distances = batch_distances(lat, lng, lats, lngs)
+            for k in top_k(distances, max_candidates, radius_km):
+                pairs.append((float(distances[k]), i, idx[k]))
+    return pairs
+
+
+def greedy_assignment(pairs):
+    """Match closest pairs first; returns [(ride_index, driver_index, distance_km)]."""
+    used_rides, used_drivers = set(), set()
+    matched = []
+    for distance, i, j in sorted(pairs):
+        if i in used_rides or j in used_drivers:
+            continue
+        used_rides.add(i)
+        used_drivers.add(j)
+        matched.append((i, j, distance))
+    return matched
+
+
+def optimal_assignment(pairs, n_rides, n_drivers):
+    """Minimum total distance matching over the candidate pairs (needs scipy).
+
+    Each ride also gets a private dummy driver at UNMATCHED_COST, so a full
+    matching always exists and rides without a real match land on their dummy.
+    """
+    if min_weight_full_bipartite_matching is None:
+        raise RuntimeError("Optimal dispatch requires scipy.")
+    if not pairs:
+        return []
+    rows = [i for _, i, _ in pairs] + list(range(n_rides))
+    cols = [j for _, _, j in pairs] + [n_drivers + i for i in range(n_rides)]
+    # The solver treats explicit zeros as missing edges, so nudge zero distances
+    costs = [distance + 1e-9 for distance, _, _ in pairs] + [UNMATCHED_COST] * n_rides
+    graph = csr_matrix((costs, (rows, cols)), shape=(n_rides, n_drivers + n_rides))
+    ride_idx, driver_idx = min_weight_full_bipartite_matching(graph)
+    distance_of = {(i, j): distance for distance, i, j in pairs}
+    return [
+        (int(i), int(j), distance_of[(i, j)])
+        for i, j in zip(ride_idx.tolist(), driver_idx.tolist()) if j < n_drivers
+    ]
+
+
+def assign(rides, drivers, radius_km, mode="greedy", max_candidates=20):
+    """Batch-assign rides to drivers; returns [(ride_id, driver_id, distance_km)]."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown dispatch mode {mode!r}.")
+    pairs = candidate_pairs(rides, drivers, radius_km, max_candidates)
+    if mode == "optimal":
+        matched = optimal_assignment(pairs, len(rides), len(drivers))
+    else:
+        matched = greedy_assignment(pairs)
+    return [(rides[i][0], drivers[j][0], distance) for i, j, distance in matched]
+
+
+# ---------- Database side ----------
+
+def pending_rides():
+    """Pending rides with known pickup coordinates as (id, lat, lng)."""
+    return list(
+        RideRequest.objects.filter(status="pending", pickup_lat__isnull=False, pickup_lng__isnull=False)
+        .values_list("id", "pickup_lat", "pickup_lng")
+    )
+
+
+def available_drivers():
+    """Online drivers with a fresh position as (user_id, lat, lng)."""
+    if live_locations.enabled:
+        return [(driver_id, lat, lng) for driver_id, (lat, lng, _) in live_locations.positions().items()]
+    located = online_drivers().filter(current_lat__isnull=False, current_lng__isnull=False)
+    return list(located.values_list("user_id", "current_lat", "current_lng"))
+
+
+def dispatch(radius_km=None, mode=None, max_candidates=None, commit=True):
+    """Match all pending rides to available drivers and replace the current offers."""
+    assignments = assign(
+        pending_rides(),
+        available_drivers(),
+        radius_km if radius_km is not None else get_setting("RADIUS_KM"),
+        mode or get_setting("MODE"),
+        max_candidates or get_setting("MAX_CANDIDATES"),
+    )
+    if commit:
+        with transaction.atomic():
+            RideOffer.objects.all().delete()
+            RideOffer.objects.bulk_create([
+                RideOffer(ride_request_id=ride_id, driver_id=driver_id, distance_km=round(distance, 2))
+                for ride_id, driver_id, distance in assignments
+            ])
+            etags.bump(etags.OFFERS)
+    return assignments
@@ -0,0 +1,100 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.db import transaction
+from django.middleware.csrf import get_token
+
+DEFAULTS = {
+    "CACHE_ALIAS": "default",
+}
+
+# Version scopes. Writes bump the scopes they can change (see core.signals);
+# a page's ETag is built from the versions of the scopes it shows.
+RIDES = "rides"            # pending rides: any RideRequest or Booking write
+OFFERS = "offers"          # the dispatch offer table, replaced as a whole
+
+
+def driver_scope(driver_id):
+    """A driver's bookings, reviews, stats and profile."""
+    return f"driver:{driver_id}"
+
+
+def reviews_scope(driver_id):
+    return f"reviews:{driver_id}"
+
+
+def get_setting(name):
+    return getattr(settings, "CONDITIONAL_GET", {}).get(name, DEFAULTS[name])
+
+
+def _cache():
+    return caches[get_setting("CACHE_ALIAS")]
+
+
+def _key(scope):
+    return f"etag-version:{scope}"
+
+
+def bump(*scopes):
+    """Invalidate the scopes once the current transaction commits."""
+    def apply():
+        cache = _cache()
+        for scope in scopes:
+            try:
+                cache.incr(_key(scope))
+            except ValueError:
+                cache.set(_key(scope), time.time_ns(), None)
+    transaction.on_commit(apply)
+
+
+def versions(*scopes):
+    cache = _cache()
+    keys = [_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # First use (or evicted): start a fresh version, never reuse an old one
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def page_etag(request, *scopes):
+    """ETag for a page showing the given scopes to this user, or None for no ETag.
+
+    Pages with flash messages waiting are never answered with 304, or the
+    messages would be lost. The CSRF cookie is part of the tag because the
+    cached page carries a token derived from it; it is created here if the
+    client has none yet, so the tag does not change on the next request.
+    """
+    if len(get_messages(request)):
+        return None
+    get_token(request)
+    parts = [
+        str(request.user.pk),
+        request.META["CSRF_COOKIE"],
+        request.GET.urlencode(),
+        *map(str, versions(*scopes)),
+    ]
+    return hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+
+
+# ---------- Per-view ETag functions for django.views.decorators.http.condition ----------
+
+def driver_dashboard_etag(request):
+    if not request.user.is_authenticated or request.user.role != "driver":
+        return None
+    return page_etag(request, RIDES, OFFERS, driver_scope(request.user.pk))
+
+
+def available_rides_etag(request):
+    if not request.user.is_authenticated or request.user.role != "driver":
+        return None
+    return page_etag(request, RIDES)
+
+
+def driver_reviews_etag(request, driver_id):
+    return page_etag(request, reviews_scope(driver_id))
@@ -0,0 +1,163 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, FloatField, Func, Value
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+from django.utils import timezone
+
+from .locations import get_live_setting, live_locations
+from .models import DriverProfile, RideRequest
+from .utils import EARTH_RADIUS_KM, batch_distances, bounding_box, cells_in_box, top_k
+
+DEFAULTS = {
+    # "python": fetch the bounding box and measure in Python;
+    # "sql": measure, order and limit inside the database
+    "MODE": "python",
+}
+
+QUERY_MODES = ("python", "sql")
+
+# Half of the Earth's circumference; no two points are further apart than this.
+MAX_RADIUS_KM = 20038
+
+
+def get_setting(name):
+    return getattr(settings, "GEO_QUERIES", {}).get(name, DEFAULTS[name])
+
+
+class Haversine(Func):
+    """Great-circle distance in km from a fixed point to a row's lat/lng columns.
+
+    SQLite calls the HAVERSINE_KM function registered on each connection
+    (see core.signals); other databases get the formula in native SQL trig.
+    """
+
+    function = "HAVERSINE_KM"
+    output_field = FloatField()
+
+    def __init__(self, lat, lng, lat_field, lng_field):
+        super().__init__(Value(float(lat)), Value(float(lng)), F(lat_field), F(lng_field))
+
+    def as_sql(self, compiler, connection, **extra_context):
+        lat1, lng1, lat2, lng2 = self.get_source_expressions()
+        a = (
+            Power(Sin(Radians(lat2 - lat1) / 2), 2)
+            + Cos(Radians(lat1)) * Cos(Radians(lat2)) * Power(Sin(Radians(lng2 - lng1) / 2), 2)
+        )
+        return compiler.compile(2 * EARTH_RADIUS_KM * ASin(Sqrt(a)))
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(compiler, connection, **extra_context)
+
+
+def within_radius(queryset, lat, lng, radius_km, lat_field, lng_field, cell_field):
+    """Narrow a queryset to rows inside the bounding box of a search radius.
+
+    The grid cell filter hits the cell index; the lat/lng range then trims
+    the corners of the outer cells so only real candidates leave the database.
+    """
+    min_lat, max_lat, min_lng, max_lng = box = bounding_box(lat, lng, radius_km)
+    filters = {
+        f"{lat_field}__gte": min_lat,
+        f"{lat_field}__lte": max_lat,
+        f"{lng_field}__gte": min_lng,
+        f"{lng_field}__lte": max_lng,
+    }
+    cells = cells_in_box(box)
+    if cells is not None:
+        filters[f"{cell_field}__in"] = cells
+    return queryset.filter(**filters)
+
+
+def nearest(queryset, lat, lng, radius_km, limit, lat_field, lng_field, cell_field):
+    """Return up to `limit` (obj, distance_km) pairs within radius_km, closest first.
+
+    In "sql" mode only those rows leave the database; in "python" mode the
+    whole bounding box is fetched and ranked here.
+    """
+    mode = get_setting("MODE")
+    if mode not in QUERY_MODES:
+        raise ValueError(f"Unknown geo query mode {mode!r}.")
+    if mode == "sql":
+        rows = (
+            within_radius(queryset, lat, lng, radius_km, lat_field, lng_field, cell_field)
+            .annotate(distance_km=Haversine(lat, lng, lat_field, lng_field))
+            .filter(distance_km__lte=radius_km)
+            .order_by("distance_km")
+        )
+        if limit:
+            rows = rows[:limit]
+        return [(obj, obj.distance_km) for obj in rows]
+    candidates = list(within_radius(queryset, lat, lng, radius_km, lat_field, lng_field, cell_field))
+    distances = batch_distances(
+        lat, lng,
+        [getattr(obj, lat_field) for obj in candidates],
+        [getattr(obj, lng_field) for obj in candidates],
+    )
+    return [(candidates[i], float(distances[i])) for i in top_k(distances, limit or None, radius_km)]
+
+
+def live_nearest_drivers(lat, lng, radius_km=None, limit=None):
+    """Like nearest_drivers, but positions come from the live location store.
+
+    Returns None when the store is disabled so callers can fall back to the
+    database. Profiles carry the live position in current_lat/current_lng.
+    """
+    found = live_locations.nearest(lat, lng, radius_km, limit)
+    if found is None:
+        return None
+    profiles = DriverProfile.objects.select_related("user").in_bulk(
+        [driver_id for driver_id, _, _, _ in found], field_name="user_id"
+    )
+    results = []
+    for driver_id, d_lat, d_lng, distance in found:
+        profile = profiles.get(driver_id)
+        if profile is not None:
+            profile.current_lat, profile.current_lng = d_lat, d_lng
+            results.append((profile, distance))
+    return results
+
+
+def online_drivers():
+    """Profiles of free drivers who reported a position within STALE_AFTER seconds."""
+    cutoff = timezone.now() - timedelta(seconds=get_live_setting("STALE_AFTER"))
+    return DriverProfile.objects.select_related("user").filter(availability="online", location_updated_at__gte=cutoff)
+
+
+def nearest_drivers(lat, lng, radius_km=10, limit=10):
+    """Online drivers within radius_km of a point as (profile, distance_km), closest first."""
+    live = live_nearest_drivers(lat, lng, radius_km, limit)
+    if live is not None:
+        return live
+    return nearest(
+        online_drivers(),
+        lat, lng, radius_km, limit,
+        "current_lat", "current_lng", "geo_cell",
+    )
+
+
+def k_nearest_drivers(lat, lng, k=10, radius_km=10):
+    """The k closest drivers, widening the search radius until k are found.
+
+    Anything outside the radius that produced k drivers is further away than
+    all of them, so the result is exact and not just a local approximation.
+    """
+    while True:
+        found = nearest_drivers(lat, lng, radius_km, k)
+        if len(found) >= k or radius_km >= MAX_RADIUS_KM:
+            return found
+        radius_km = min(radius_km * 4, MAX_RADIUS_KM)
+
+
+def located_drivers():
+    """Online driver profiles that have coordinates set."""
+    return online_drivers().filter(current_lat__isnull=False, current_lng__isnull=False)
+
+
+def nearby_pending_rides(lat, lng, radius_km=10, limit=10):
+    """Pending rides picked up within radius_km as (ride, distance_km), closest first."""
+    return nearest(
+        RideRequest.objects.filter(status="pending"),
+        lat, lng, radius_km, limit,
+        "pickup_lat", "pickup_lng", "pickup_cell",
+    )
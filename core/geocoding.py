@@ -0,0 +1,323 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .locations import bring_online, live_locations
+from .models import GeocodeCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "PROVIDER": "core.geocoding.NominatimProvider",
+    "OPTIONS": {},
+    "TTL": timedelta(days=30),
+    "NEGATIVE_TTL": timedelta(days=1),
+    "MAX_ENTRIES": 1024,
+    "ASYNC": True,
+    "BATCH_SIZE": 50,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "GEOCODING", {}).get(name, DEFAULTS[name])
+
+
+def normalize_address(address):
+    """Cache key for an address: lowercased with whitespace and commas tidied."""
+    if not address:
+        return ""
+    key = re.sub(r"\s*,\s*", ", ", address.strip().lower())
+    return re.sub(r"\s+", " ", key).strip(" ,")[:255]
+
+
+# ---------- Providers ----------
+
+class GeocodingProvider:
+    """Turns an address into coordinates.
+
+    geocode() returns (lat, lng), or (None, None) when the address is unknown.
+    Transport failures should raise so they are not cached as misses.
+    Callers go through lookup(), which spaces requests min_interval seconds apart.
+    """
+
+    min_interval = 0
+
+    def __init__(self, min_interval=None):
+        if min_interval is not None:
+            self.min_interval = min_interval
+        self._throttle_lock = threading.Lock()
+        self._next_call = 0.0
+
+    def lookup(self, address):
+        if self.min_interval:
+            with self._throttle_lock:
+                wait = self._next_call - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                self._next_call = time.monotonic() + self.min_interval
+        return self.geocode(address)
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+
+class NominatimProvider(GeocodingProvider):
+    url = "https://nominatim.openstreetmap.org/search"
+    user_agent = "RentADriver/1.0 (education; contact: example@example.com)"
+    # Nominatim's usage policy allows at most one request per second
+    min_interval = 1.0
+
+    def __init__(self, timeout=5, min_interval=None):
+        super().__init__(min_interval)
+        self.timeout = timeout
+
+    def geocode(self, address):
+        params = {
+            "q": address,
+            "format": "json",
+            "limit": 1,
+        }
+        req = Request(self.url + "?" + urlencode(params), headers={"User-Agent": self.user_agent})
+        with urlopen(req, timeout=self.timeout) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+        if isinstance(data, list) and data:
+            return float(data[0].get("lat")), float(data[0].get("lon"))
+        return None, None
+
+
+class StaticProvider(GeocodingProvider):
+    """Local stub that answers from a fixed {address: (lat, lng)} mapping."""
+
+    def __init__(self, results=None, min_interval=None):
+        super().__init__(min_interval)
+        self.results = {normalize_address(k): tuple(v) for k, v in (results or {}).items()}
+
+    def geocode(self, address):
+        return self.results.get(normalize_address(address), (None, None))
+
+
+_provider = None
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = import_string(get_setting("PROVIDER"))(**get_setting("OPTIONS"))
+    return _provider
+
+
+# ---------- Cache ----------
+
+class _LRUCache:
+    """Thread-safe in-memory LRU of key -> (value, expires_at timestamp)."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > get_setting("MAX_ENTRIES"):
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_memory = _LRUCache()
+
+
+def lookup_cached(address):
+    """Return cached (lat, lng) for an address without calling the provider.
+
+    Returns None when the address has not been looked up yet (or the entry
+    expired); a cached miss comes back as (None, None).
+    """
+    key = normalize_address(address)
+    if not key:
+        return None, None
+    hit = _memory.get(key)
+    if hit is not None:
+        return hit
+    row = GeocodeCache.objects.filter(address_key=key, expires_at__gt=timezone.now()).first()
+    if row is None:
+        return None
+    result = (row.lat, row.lng)
+    _memory.set(key, result, row.expires_at.timestamp())
+    return result
+
+
+def geocode_address(address):
+    """Return (lat, lng) for an address, or (None, None) if it cannot be found.
+
+    Lookups go memory → GeocodeCache table → provider. Misses are cached for
+    NEGATIVE_TTL so a bad address is not looked up on every save; provider
+    errors are not cached at all.
+    """
+    cached = lookup_cached(address)
+    if cached is not None:
+        return cached
+
+    try:
+        result = get_provider().lookup(address)
+    except Exception:
+        logger.warning("Geocoding failed for %r", address, exc_info=True)
+        return None, None
+    ttl = get_setting("TTL") if result[0] is not None else get_setting("NEGATIVE_TTL")
+    expires_at = timezone.now() + ttl
+    key = normalize_address(address)
+    GeocodeCache.objects.update_or_create(
+        address_key=key,
+        defaults={"lat": result[0], "lng": result[1], "expires_at": expires_at},
+    )
+    _memory.set(key, result, expires_at.timestamp())
+    return result
+
+
+def purge_expired():
+    """Delete expired rows from the GeocodeCache table; returns the count."""
+    deleted, _ = GeocodeCache.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+# ---------- Background pipeline ----------
+
+# model label -> (address field, lat field, lng field)
+TARGETS = {
+    "core.driverprofile": ("address", "current_lat", "current_lng"),
+    "core.riderequest": ("pickup_location", "pickup_lat", "pickup_lng"),
+}
+
+
+def geocode_rows(rows):
+    """Fill missing coordinates on model instances of one TARGETS model.
+
+    Each distinct address is looked up once per batch. Returns the number of
+    rows that received coordinates.
+    """
+    if not rows:
+        return 0
+    address_field, lat_field, lng_field = TARGETS[rows[0]._meta.label_lower]
+    results = {}
+    filled = 0
+    for row in rows:
+        address = getattr(row, address_field)
+        key = normalize_address(address)
+        if key not in results:
+            results[key] = geocode_address(address)
+        lat, lng = results[key]
+        if lat is None or lng is None:
+            continue
+        # Coordinates the user entered by hand win over geocoded ones
+        if getattr(row, lat_field) is None:
+            setattr(row, lat_field, lat)
+        if getattr(row, lng_field) is None:
+            setattr(row, lng_field, lng)
+        if row._meta.label_lower == "core.driverprofile":
+            # A driver's own address counts as a position report. availability
+            # was read before the lookup, so it is switched with a conditional
+            # update instead of saved, or a busy set meanwhile would be lost.
+            row.move_to(row.current_lat, row.current_lng)
+            row.save(update_fields=[lat_field, lng_field, "location_updated_at"])
+            bring_online(row.user_id)
+            # Busy drivers are left out of live reads, so publishing is safe either way
+            live_locations.update(row.user_id, row.current_lat, row.current_lng)
+        else:
+            row.save(update_fields=[lat_field, lng_field])
+        filled += 1
+    return filled
+
+
+def pending_rows(label):
+    """Queryset of rows for a TARGETS model that have an address but no coordinates."""
+    address_field, lat_field, lng_field = TARGETS[label]
+    model = apps.get_model(label)
+    return (
+        model.objects.filter(Q(**{f"{lat_field}__isnull": True}) | Q(**{f"{lng_field}__isnull": True}))
+        .exclude(**{f"{address_field}__isnull": True})
+        .exclude(**{address_field: ""})
+    )
+
+
+class GeocodeWorker:
+    """Single daemon thread that geocodes queued rows after the request ends.
+
+    Jobs are (model label, pk) pairs. The worker drains up to BATCH_SIZE jobs
+    at a time so repeated addresses in a burst hit the provider once. Jobs
+    still queued at process exit are lost; manage.py geocode_pending picks
+    those rows up again.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, label, pk):
+        self._queue.put((label, pk))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="geocode-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < get_setting("BATCH_SIZE"):
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.process(jobs)
+            except Exception:
+                logger.exception("Geocoding batch failed")
+            finally:
+                close_old_connections()
+
+    def process(self, jobs):
+        by_label = {}
+        for label, pk in jobs:
+            by_label.setdefault(label, set()).add(pk)
+        for label, pks in by_label.items():
+            geocode_rows(list(pending_rows(label).filter(pk__in=pks)))
+
+
+worker = GeocodeWorker()
+
+
+def schedule_geocode(instance):
+    """Geocode a DriverProfile or RideRequest once the current transaction commits."""
+    label = instance._meta.label_lower
+    if not get_setting("ASYNC"):
+        transaction.on_commit(lambda: worker.process([(label, instance.pk)]))
+        return
+    transaction.on_commit(lambda: worker.enqueue(label, instance.pk))
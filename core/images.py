@@ -0,0 +1,237 @@
+import io
+import logging
+import os
+import queue
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.template.defaultfilters import filesizeformat
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import etags
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "MAX_UPLOAD_SIZE": 8 * 1024 * 1024,
+    "MAX_PIXELS": 40_000_000,
+    "FORMATS": ("JPEG", "PNG", "WEBP", "GIF"),
+    # Originals are re-encoded no larger than this on their longest side
+    "MAX_DIMENSION": 1600,
+    "QUALITY": 82,
+    "ASYNC": True,
+}
+
+# model label -> (image field, thumbnail field, thumbnail size, crop to size)
+TARGETS = {
+    "core.driverprofile": ("profile_picture", "profile_thumbnail", (192, 192), True),
+    "core.driverreview": ("image", "image_thumbnail", (400, 400), False),
+}
+
+
+def get_setting(name):
+    return getattr(settings, "IMAGES", {}).get(name, DEFAULTS[name])
+
+
+# ---------- Uploads ----------
+
+class SizeLimitUploadHandler(FileUploadHandler):
+    """Drops an uploaded file as soon as it grows past MAX_UPLOAD_SIZE.
+
+    Runs before Django's own handlers, which keep small files in memory and
+    stream the rest to a temp file chunk by chunk. The names of dropped
+    fields are left in request.oversized_uploads for the view to report.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > get_setting("MAX_UPLOAD_SIZE"):
+            if not hasattr(self.request, "oversized_uploads"):
+                self.request.oversized_uploads = []
+            self.request.oversized_uploads.append(self.field_name)
+            raise SkipFile()
+        return raw_data
+
+    def file_complete(self, file_size):
+        return None
+
+
+def upload_error(request, field_name):
+    """Why the upload in field_name cannot be used, or None if it is fine (or absent).
+
+    Only the image header is read here; decoding happens in the background.
+    """
+    if field_name in getattr(request, "oversized_uploads", ()):
+        return f"Image is too large (max {filesizeformat(get_setting('MAX_UPLOAD_SIZE'))})."
+    upload = request.FILES.get(field_name)
+    if upload is None:
+        return None
+    try:
+        with Image.open(upload) as img:
+            fmt, (width, height) = img.format, img.size
+            img.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        return "Upload a valid image file."
+    finally:
+        upload.seek(0)
+    if fmt not in get_setting("FORMATS"):
+        return f"{fmt} images are not supported."
+    if width * height > get_setting("MAX_PIXELS"):
+        return "Image dimensions are too large."
+    return None
+
+
+# ---------- Processing ----------
+
+def _encode(img):
+    buf = io.BytesIO()
+    # No exif/icc arguments, so camera metadata (GPS included) is not carried over
+    img.save(buf, "WEBP", quality=get_setting("QUALITY"), method=4)
+    return buf.getvalue()
+
+
+def _prepare(img):
+    img = ImageOps.exif_transpose(img)
+    return img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+
+
+def process_image(instance):
+    """Re-encode an instance's image without metadata and add its thumbnail.
+
+    Both are WebP; the original is capped at MAX_DIMENSION. Returns False when
+    there is nothing to do (no image, or already processed).
+    """
+    image_field, thumb_field, size, crop = TARGETS[instance._meta.label_lower]
+    source = getattr(instance, image_field)
+    if not source or getattr(instance, thumb_field):
+        return False
+
+    with source.open("rb") as f, Image.open(f) as img:
+        img.load()
+    img = _prepare(img)
+    limit = get_setting("MAX_DIMENSION")
+    img.thumbnail((limit, limit), Image.LANCZOS)
+    thumb = ImageOps.fit(img, size, Image.LANCZOS) if crop else img.copy()
+    if not crop:
+        thumb.thumbnail(size, Image.LANCZOS)
+
+    old_name = source.name
+    stem = os.path.splitext(os.path.basename(old_name))[0]
+    source.save(f"{stem}.webp", ContentFile(_encode(img)), save=False)
+    thumb_file = getattr(instance, thumb_field)
+    thumb_file.save(f"{stem}.webp", ContentFile(_encode(thumb)), save=False)
+    # One conditional UPDATE, so an upload or removal that lands meanwhile is never overwritten
+    updated = type(instance).objects.filter(pk=instance.pk, **{image_field: old_name}).update(
+        **{image_field: source.name, thumb_field: thumb_file.name}
+    )
+    if not updated:
+        delete_images(instance)
+        return False
+    if old_name != source.name:
+        source.storage.delete(old_name)
+    # update() sends no post_save, so bump the pages showing this image here
+    etags.bump(*_etag_scopes(instance))
+    return True
+
+
+def _etag_scopes(instance):
+    if instance._meta.label_lower == "core.driverprofile":
+        return [etags.driver_scope(instance.user_id)]
+    return [etags.driver_scope(instance.driver_id), etags.reviews_scope(instance.driver_id)]
+
+
+def delete_images(instance):
+    """Remove an instance's image and thumbnail files (the row is not saved)."""
+    image_field, thumb_field, _, _ = TARGETS[instance._meta.label_lower]
+    for name in (thumb_field, image_field):
+        field = getattr(instance, name)
+        if field:
+            field.delete(save=False)
+
+
+def image_files(instance):
+    """The instance's current image and thumbnail as (storage, name) pairs."""
+    image_field, thumb_field, _, _ = TARGETS[instance._meta.label_lower]
+    return [(f.storage, f.name) for f in (getattr(instance, thumb_field), getattr(instance, image_field)) if f]
+
+
+def delete_files_on_commit(files):
+    """Delete files captured with image_files() once the current transaction commits.
+
+    Call it after the row has stopped pointing at them, so a failed save
+    leaves the old files in place.
+    """
+    def apply():
+        for storage, name in files:
+            storage.delete(name)
+    transaction.on_commit(apply)
+
+
+def pending_rows(label):
+    """Queryset of rows for a TARGETS model with an image but no thumbnail yet."""
+    image_field, thumb_field, _, _ = TARGETS[label]
+    return (
+        apps.get_model(label).objects.exclude(**{f"{image_field}__isnull": True}).exclude(**{image_field: ""})
+        .filter(Q(**{f"{thumb_field}__isnull": True}) | Q(**{thumb_field: ""}))
+    )
+
+
+def process_rows(label, pks):
+    done = 0
+    for row in pending_rows(label).filter(pk__in=pks):
+        try:
+            done += process_image(row)
+        except (OSError, Image.DecompressionBombError):
+            logger.exception("Could not process %s %s", label, row.pk)
+    return done
+
+
+class ImageWorker:
+    """Single daemon thread that processes uploaded images after the response.
+
+    Jobs are (model label, pk) pairs. Jobs still queued at process exit are
+    lost; manage.py process_images picks those rows up again.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, label, pk):
+        self._queue.put((label, pk))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="image-worker", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            label, pk = self._queue.get()
+            try:
+                process_rows(label, [pk])
+            except Exception:
+                logger.exception("Image processing failed")
+            finally:
+                close_old_connections()
+
+
+worker = ImageWorker()
+
+
+def schedule_processing(instance):
+    """Process a freshly uploaded image once the current transaction commits."""
+    label = instance._meta.label_lower
+    if not get_setting("ASYNC"):
+        transaction.on_commit(lambda: process_rows(label, [instance.pk]))
+        return
+    transaction.on_commit(lambda: worker.enqueue(label, instance.pk))
@@ -0,0 +1,113 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast, NullIf
+
+from .models import DriverStats
+
+DEFAULTS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 300,
+    "LOCK_TIMEOUT": 30,
+}
+
+CONTEXT_KEY = "leaderboard:context"
+VERSION_KEY = "leaderboard:version"
+LOCK_KEY = "leaderboard:rebuilding"
+
+
+def get_setting(name):
+    return getattr(settings, "LEADERBOARD_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _cache():
+    return caches[get_setting("CACHE_ALIAS")]
+
+
+def leaderboard_context():
+    """Template context for leaderboard.html, read from the DriverStats table."""
+    top = (
+        DriverStats.objects.select_related("driver")
+        .annotate(avg=Cast("rating_sum", FloatField()) / NullIf("rating_count", 0))
+        .order_by("-completed_count", F("avg").desc(nulls_last=True))[:10]
+    )
+    leaderboard = [
+        {
+            "username": s.driver.username,
+            "total_completed": s.completed_count,
+            "avg_rating": round(s.avg or 0, 2),
+        }
+        for s in top
+    ]
+    totals = DriverStats.objects.aggregate(
+        drivers=Count("driver"),
+        rides=Sum("completed_count"),
+        rating_sum=Sum("rating_sum"),
+        rating_count=Sum("rating_count"),
+    )
+    return {
+        "leaderboard": leaderboard,
+        "total_drivers": totals["drivers"],
+        "total_rides": totals["rides"] or 0,
+        "avg_rating": round(totals["rating_sum"] / totals["rating_count"], 2) if totals["rating_count"] else 0.0,
+    }
+
+
+def _current_version(cache):
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def invalidate_leaderboard():
+    """Mark the cached leaderboard stale; the next request rebuilds it."""
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def _cached_entry():
+    """(version, context) for leaderboard_context() behind a cache with stale-while-revalidate.
+
+    An entry is fresh while its version matches VERSION_KEY. Once stale, the
+    first request to take the rebuild lock recomputes it; concurrent requests
+    keep getting the stale copy (with its old version) instead of all
+    recomputing at once.
+    """
+    cache = _cache()
+    version = _current_version(cache)
+    entry = cache.get(CONTEXT_KEY)
+    if entry is not None and entry["version"] == version:
+        return version, entry["context"]
+    if not cache.add(LOCK_KEY, True, get_setting("LOCK_TIMEOUT")):
+        if entry is not None:
+            return entry["version"], entry["context"]
+        return version, leaderboard_context()
+    try:
+        context = leaderboard_context()
+        # Stored under the version read before computing, so an invalidation
+        # that lands mid-rebuild still leaves this entry stale.
+        cache.set(CONTEXT_KEY, {"version": version, "context": context}, get_setting("TTL"))
+    finally:
+        cache.delete(LOCK_KEY)
+    return version, context
+
+
+def cached_leaderboard_context():
+    return _cached_entry()[1]
+
+
+def leaderboard_page_context():
+    """Context for leaderboard.html: the cached data plus the version it was built at.
+
+    The template caches its rendered body keyed on leaderboard_version, so a
+    hit skips rendering too and invalidate_leaderboard() retires it.
+    """
+    version, context = _cached_entry()
+    return {**context, "leaderboard_version": version}
@@ -0,0 +1,392 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from . import etags
+from .models import Account, Booking, DriverProfile
+from .utils import batch_distances, bounding_box, cell_for, cells_in_box, top_k
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "FLUSH_INTERVAL": 5,
+    "PING_INTERVAL": 60,
+}
+
+LIVE_DEFAULTS = {
+    "ENABLED": True,
+    "BACKEND": "local",
+    "CACHE_ALIAS": "live_locations",
+    "STALE_AFTER": 600,
+    "REWARM_INTERVAL": 30,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "LOCATION_INGEST", {}).get(name, DEFAULTS[name])
+
+
+def get_live_setting(name):
+    return getattr(settings, "LIVE_LOCATIONS", {}).get(name, LIVE_DEFAULTS[name])
+
+
+# ---------- Live positions ----------
+
+class LocalBackend:
+    """Positions in a dict, bucketed by grid cell; only visible to the current process."""
+
+    def __init__(self):
+        self._data = {}
+        self._cells = defaultdict(set)
+        self._busy = set()
+        self._lock = threading.Lock()
+
+    def _unindex(self, driver_id):
+        old = self._data.get(driver_id)
+        if old is not None:
+            cell = cell_for(old[0], old[1])
+            self._cells[cell].discard(driver_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def set(self, driver_id, position):
+        with self._lock:
+            self._unindex(driver_id)
+            self._data[driver_id] = position
+            self._cells[cell_for(position[0], position[1])].add(driver_id)
+
+    def all(self):
+        with self._lock:
+            return dict(self._data)
+
+    def in_cells(self, cells):
+        with self._lock:
+            return {i: self._data[i] for cell in cells for i in self._cells.get(cell, ())}
+
+    def delete_many(self, driver_ids):
+        with self._lock:
+            for driver_id in driver_ids:
+                self._unindex(driver_id)
+                self._data.pop(driver_id, None)
+
+    def set_busy(self, driver_id, busy):
+        with self._lock:
+            if busy:
+                self._busy.add(driver_id)
+            else:
+                self._busy.discard(driver_id)
+
+    def replace_busy(self, driver_ids):
+        with self._lock:
+            self._busy = set(driver_ids)
+
+    def busy(self):
+        with self._lock:
+            return set(self._busy)
+
+
+class CacheBackend:
+    """Positions in a Django cache (Redis/Memcached) shared by all processes.
+
+    Each driver has its own key; a registry key lists all ids and one
+    registry per grid cell lists the ids last seen there. A registry write
+    lost to a concurrent update heals itself on that driver's next ping;
+    ids that moved away are dropped from a cell registry when it is read.
+    """
+
+    registry_key = "live-locations:ids"
+    busy_key = "live-locations:busy"
+
+    def __init__(self, alias, timeout):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def _key(self, driver_id):
+        return f"live-locations:{driver_id}"
+
+    def _cell_key(self, cell):
+        return f"live-locations:cell:{cell}"
+
+    def _register(self, key, driver_id):
+        ids = self.cache.get(key, set())
+        if driver_id not in ids:
+            self.cache.set(key, ids | {driver_id}, None)
+
+    def set(self, driver_id, position):
+        self.cache.set(self._key(driver_id), position, self.timeout)
+        self._register(self.registry_key, driver_id)
+        self._register(self._cell_key(cell_for(position[0], position[1])), driver_id)
+
+    def all(self):
+        ids = self.cache.get(self.registry_key, set())
+        found = self.cache.get_many([self._key(i) for i in ids])
+        positions = {i: found[self._key(i)] for i in ids if self._key(i) in found}
+        if len(positions) < len(ids):
+            self.cache.set(self.registry_key, set(positions), None)
+        return positions
+
+    def in_cells(self, cells):
+        registries = self.cache.get_many([self._cell_key(cell) for cell in cells])
+        ids = set().union(*registries.values())
+        found = self.cache.get_many([self._key(i) for i in ids])
+        positions = {}
+        for key, members in registries.items():
+            here = {
+                i for i in members
+                if self._key(i) in found and self._cell_key(cell_for(*found[self._key(i)][:2])) == key
+            }
+            if here != members:
+                self.cache.set(key, here, None)
+            positions.update((i, found[self._key(i)]) for i in here)
+        return positions
+
+    def delete_many(self, driver_ids):
+        self.cache.delete_many([self._key(i) for i in driver_ids])
+
+    def set_busy(self, driver_id, busy):
+        ids = self.cache.get(self.busy_key, set())
+        if (driver_id in ids) != busy:
+            self.cache.set(self.busy_key, ids | {driver_id} if busy else ids - {driver_id}, None)
+
+    def replace_busy(self, driver_ids):
+        self.cache.set(self.busy_key, set(driver_ids), None)
+
+    def busy(self):
+        return self.cache.get(self.busy_key, set())
+
+
+class LiveLocationStore:
+    """Last known (lat, lng, timestamp) per driver, kept out of the database.
+
+    Nearby lookups read from here; LocationBuffer snapshots the same pings
+    back to DriverProfile. Drivers silent for STALE_AFTER seconds drop out,
+    and drivers marked busy (ongoing booking) are left out of every read.
+    Every REWARM_INTERVAL seconds the store syncs from DriverProfile, so a
+    restart does not empty the nearby lists and, with the "local" backend,
+    writes made by other processes show up after at most that long.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._warmed_at = None
+
+    @property
+    def enabled(self):
+        return get_live_setting("ENABLED")
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            if get_live_setting("BACKEND") == "cache":
+                self._backend = CacheBackend(get_live_setting("CACHE_ALIAS"), get_live_setting("STALE_AFTER"))
+            else:
+                self._backend = LocalBackend()
+        return self._backend
+
+    def update(self, driver_id, lat, lng):
+        if self.enabled:
+            self.backend.set(driver_id, (lat, lng, time.time()))
+
+    def set_busy(self, driver_id, busy):
+        if self.enabled:
+            self.backend.set_busy(driver_id, busy)
+
+    def remove(self, driver_id):
+        if self.enabled:
+            self.backend.delete_many([driver_id])
+
+    def warm(self):
+        """Sync from DriverProfile: newer positions win, availability comes from the database."""
+        cutoff = timezone.now() - timedelta(seconds=get_live_setting("STALE_AFTER"))
+        fresh = DriverProfile.objects.filter(
+            current_lat__isnull=False, current_lng__isnull=False, location_updated_at__gte=cutoff
+        )
+        rows = fresh.values_list("user_id", "current_lat", "current_lng", "location_updated_at", "availability")
+        current = self.backend.all()
+        busy, offline = set(), []
+        for driver_id, lat, lng, updated_at, availability in rows:
+            if availability == "offline":
+                offline.append(driver_id)
+                continue
+            if availability == "busy":
+                busy.add(driver_id)
+            if driver_id not in current or current[driver_id][2] < updated_at.timestamp():
+                self.backend.set(driver_id, (lat, lng, updated_at.timestamp()))
+        if offline:
+            self.backend.delete_many(offline)
+        self.backend.replace_busy(busy)
+        self._warmed_at = time.monotonic()
+
+    def _maybe_warm(self):
+        if self._warmed_at is None or time.monotonic() - self._warmed_at > get_live_setting("REWARM_INTERVAL"):
+            self.warm()
+
+    def _fresh(self, positions):
+        cutoff = time.time() - get_live_setting("STALE_AFTER")
+        stale = [i for i, pos in positions.items() if pos[2] < cutoff]
+        if stale:
+            self.backend.delete_many(stale)
+            for driver_id in stale:
+                del positions[driver_id]
+        for driver_id in self.backend.busy():
+            positions.pop(driver_id, None)
+        return positions
+
+    def positions(self):
+        """Fresh positions of free drivers as {driver_id: (lat, lng, timestamp)}; stale ones are evicted."""
+        self._maybe_warm()
+        return self._fresh(self.backend.all())
+
+    def nearest(self, lat, lng, radius_km=None, limit=None):
+        """Closest live drivers as [(driver_id, lat, lng, distance_km)], or None if disabled.
+
+        With a radius only the grid cells it covers are read (see core.utils.cell_for).
+        """
+        if not self.enabled:
+            return None
+        cells = cells_in_box(bounding_box(lat, lng, radius_km)) if radius_km is not None else None
+        if cells is None:
+            found = self.positions()
+        else:
+            self._maybe_warm()
+            found = self._fresh(self.backend.in_cells(cells))
+        positions = list(found.items())
+        distances = batch_distances(lat, lng, [p[0] for _, p in positions], [p[1] for _, p in positions])
+        return [
+            (positions[i][0], positions[i][1][0], positions[i][1][1], float(distances[i]))
+            for i in top_k(distances, limit, radius_km)
+        ]
+
+
+live_locations = LiveLocationStore()
+
+
+def bring_online(driver_id):
+    """Switch an offline driver online after a position report; busy and online drivers are left alone."""
+    if DriverProfile.objects.filter(user_id=driver_id, availability="offline").update(availability="online"):
+        etags.bump(etags.driver_scope(driver_id))
+
+
+def refresh_availability(driver_id):
+    """Mark a driver busy while they have an ongoing booking and online again once they have none."""
+    busy = Booking.objects.filter(driver_id=driver_id, status="ongoing").exists()
+    if busy:
+        DriverProfile.objects.filter(user_id=driver_id).update(availability="busy")
+    else:
+        DriverProfile.objects.filter(user_id=driver_id, availability="busy").update(availability="online")
+    transaction.on_commit(lambda: live_locations.set_busy(driver_id, busy))
+
+
+class LocationBuffer:
+    """Keeps the latest ping per user and writes them to the database in bulk.
+
+    A driver pinging every few seconds costs one dict assignment per ping;
+    a daemon thread flushes every FLUSH_INTERVAL seconds with one bulk UPDATE
+    per table, however many pings arrived in between.
+    """
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def record(self, user, lat, lng):
+        if user.role == "driver":
+            live_locations.update(user.pk, lat, lng)
+        with self._lock:
+            self._pending[user.pk] = (lat, lng, user.role == "driver", time.time())
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="location-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(get_setting("FLUSH_INTERVAL"))
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Location flush failed")
+            finally:
+                close_old_connections()
+
+    def flush(self):
+        """Write buffered positions to Account and DriverProfile; returns the count."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        Account.objects.bulk_update(
+            [Account(pk=uid, last_lat=lat, last_lng=lng) for uid, (lat, lng, _, _) in pending.items()],
+            ["last_lat", "last_lng"],
+            batch_size=500,
+        )
+
+        drivers = {
+            uid: (lat, lng, cell_for(lat, lng), datetime.fromtimestamp(ts, dt_timezone.utc))
+            for uid, (lat, lng, is_driver, ts) in pending.items() if is_driver
+        }
+        if drivers:
+            profile_ids = dict(
+                DriverProfile.objects.filter(user_id__in=drivers).values_list("user_id", "pk")
+            )
+            # bulk_update skips save(), so geo_cell is filled in here
+            DriverProfile.objects.bulk_update(
+                [
+                    DriverProfile(
+                        pk=profile_ids[uid], current_lat=lat, current_lng=lng, geo_cell=cell, location_updated_at=at,
+                    )
+                    for uid, (lat, lng, cell, at) in drivers.items() if uid in profile_ids
+                ],
+                ["current_lat", "current_lng", "geo_cell", "location_updated_at"],
+                batch_size=500,
+            )
+            # A ping brings an offline driver online; busy drivers stay busy
+            DriverProfile.objects.filter(user_id__in=drivers, availability="offline").update(availability="online")
+            # Location changes what the dashboard lists as nearby
+            etags.bump(*map(etags.driver_scope, drivers))
+            DriverProfile.objects.bulk_create([
+                DriverProfile(
+                    user_id=uid, current_lat=lat, current_lng=lng, geo_cell=cell, location_updated_at=at,
+                    availability="online",
+                )
+                for uid, (lat, lng, cell, at) in drivers.items() if uid not in profile_ids
+            ])
+        return len(pending)
+
+
+buffer = LocationBuffer()
+atexit.register(buffer.flush)
+
+
+def parse_pings(payload):
+    """Return the newest (lat, lng) from a JSON ping payload.
+
+    Accepts a single {"lat": .., "lng": ..} object or {"pings": [...]} with
+    optional "ts" on each ping; without timestamps the last ping wins.
+    Raises ValueError for anything else.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object.")
+    pings = payload.get("pings", [payload])
+    if not isinstance(pings, list) or not pings:
+        raise ValueError("No pings given.")
+    if not all(isinstance(p, dict) for p in pings):
+        raise ValueError("Each ping must be an object.")
+    try:
+        latest = max(enumerate(pings), key=lambda item: (float(item[1].get("ts") or 0), item[0]))[1]
+        lat = float(latest.get("lat"))
+        lng = float(latest.get("lng"))
+    except TypeError:
+        raise ValueError("Pings need numeric lat, lng and ts.")
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range.")
+    return lat, lng
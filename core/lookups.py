@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.cache import caches
+
+from .geo import k_nearest_drivers, nearby_pending_rides
+from .utils import cell_for
+
+DEFAULTS = {
+    "CACHE_ALIAS": "default",
+    "TTL": 30,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "LOOKUP_CACHE", {}).get(name, DEFAULTS[name])
+
+
+def _cached(key, build):
+    cache = caches[get_setting("CACHE_ALIAS")]
+    result = cache.get(key)
+    if result is None:
+        result = build()
+        cache.set(key, result, get_setting("TTL"))
+    return result
+
+
+def suggested_drivers(user, ride, k=5):
+    """The k drivers closest to a ride's pickup as plain dicts.
+
+    Cached for TTL seconds per (user, ride, pickup cell), so repeated clicks
+    and JSON polling reuse one lookup.
+    """
+    key = f"lookups:suggest:{user.pk}:{ride.pk}:{cell_for(ride.pickup_lat, ride.pickup_lng)}"
+    return _cached(key, lambda: [{
+        "driver_id": d.user.id,
+        "username": d.user.username,
+        "vehicle": d.vehicle_details,
+        "distance_km": round(distance, 2),
+    } for d, distance in k_nearest_drivers(ride.pickup_lat, ride.pickup_lng, k=k)])
+
+
+def nearby_rides(user, lat, lng, radius_km=10, limit=10):
+    """Pending rides near a driver as plain dicts, cached per (user, grid cell).
+
+    Within TTL seconds a listed ride may already be taken; accepting it then
+    fails cleanly in core.bookings.accept_ride.
+    """
+    key = f"lookups:nearby-rides:{user.pk}:{cell_for(lat, lng)}:{radius_km}:{limit}"
+    return _cached(key, lambda: [{
+        "ride": {
+            "id": r.id,
+            "pickup_location": r.pickup_location,
+            "dropoff_location": r.dropoff_location,
+        },
+        "distance_km": round(distance, 2),
+    } for r, distance in nearby_pending_rides(lat, lng, radius_km, limit)])
@@ -0,0 +1,74 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+
+from core.bookings import accept_ride
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, RideRequest
+
+
+class Command(BaseCommand):
+    help = "Stress-test ride acceptance with many drivers racing on a scratch database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rides", type=int, default=200)
+        parser.add_argument("--drivers", type=int, default=16)
+
+    def handle(self, *args, **options):
+        with scratch_database(on_disk=True):
+            self._run(options["rides"], options["drivers"])
+
+    def _run(self, n_rides, n_drivers):
+        customer = Account.objects.create(username="bench-customer", role="customer")
+        drivers = Account.objects.bulk_create(
+            [Account(username=f"bench-driver-{i}", role="driver") for i in range(n_drivers)]
+        )
+        RideRequest.objects.bulk_create(
+            [RideRequest(customer=customer, pickup_location="A", dropoff_location="B") for _ in range(n_rides)]
+        )
+        ride_ids = list(RideRequest.objects.values_list("id", flat=True))
+
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(n_drivers)
+
+        def race(driver):
+            order = ride_ids[:]
+            random.Random(driver.pk).shuffle(order)
+            barrier.wait()
+            try:
+                for ride_id in order:
+                    try:
+                        outcome = "accepted" if accept_ride(ride_id, driver) else "already taken"
+                    except Exception as e:
+                        outcome = f"error: {type(e).__name__}: {e}"
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=race, args=(d,)) for d in drivers]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        attempts = n_rides * n_drivers
+        self.stdout.write(f"{n_drivers} drivers x {n_rides} rides = {attempts} attempts in {elapsed:.2f}s")
+        for outcome, count in outcomes.most_common():
+            self.stdout.write(f"  {outcome}: {count}")
+
+        bookings = Booking.objects.count()
+        doubled = Booking.objects.values("ride_request").annotate(n=Count("id")).filter(n__gt=1).count()
+        still_pending = RideRequest.objects.filter(status="pending").count()
+        self.stdout.write(f"  bookings: {bookings}, rides booked twice: {doubled}, rides left pending: {still_pending}")
+        if outcomes["accepted"] != n_rides or bookings != n_rides or doubled or still_pending:
+            raise CommandError("Acceptance was not exclusive.")
+        self.stdout.write(self.style.SUCCESS("Every ride was accepted exactly once."))
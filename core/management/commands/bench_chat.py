@@ -0,0 +1,131 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.urls import reverse
+
+from core.chat import hub
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, RideRequest
+
+
+class Command(BaseCommand):
+    help = "Load-test chat delivery with many concurrent rooms long-polling on one event loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=50)
+        parser.add_argument("--messages", type=int, default=20, help="Messages sent per room.")
+        parser.add_argument("--interval", type=float, default=0.01, help="Seconds between sends in a room.")
+        parser.add_argument("--timeout", type=float, default=120)
+
+    def handle(self, *args, **options):
+        with scratch_database(on_disk=True):
+            bookings = self._seed(options["rooms"])
+            stats = asyncio.run(self._run(bookings, options["messages"], options["interval"], options["timeout"]))
+        self._report(options["rooms"], options["messages"], *stats)
+
+    def _seed(self, n_rooms):
+        customers = Account.objects.bulk_create(
+            [Account(username=f"bench-customer-{i}", role="customer") for i in range(n_rooms)]
+        )
+        drivers = Account.objects.bulk_create(
+            [Account(username=f"bench-driver-{i}", role="driver") for i in range(n_rooms)]
+        )
+        rides = RideRequest.objects.bulk_create([
+            RideRequest(customer=c, pickup_location="A", dropoff_location="B", status="accepted")
+            for c in customers
+        ])
+        bookings = Booking.objects.bulk_create([
+            Booking(ride_request=r, driver=d) for r, d in zip(rides, drivers)
+        ])
+        return [(b.id, c, d) for b, c, d in zip(bookings, customers, drivers)]
+
+    async def _run(self, bookings, n_messages, interval, timeout):
+        sent_at = {}
+        latencies = []
+        failures = []
+        peak = 0
+
+        async def client_for(user):
+            client = AsyncClient()
+            await client.aforce_login(user)
+            return client
+
+        async def listen(client, booking_id, who):
+            url = reverse("chat_poll", args=[booking_id])
+            after, texts = 0, []
+            while len(texts) < n_messages:
+                resp = await client.get(url, {"after": after})
+                if resp.status_code != 200:
+                    failures.append(f"room {booking_id} {who}: poll returned {resp.status_code}")
+                    return
+                received = time.perf_counter()
+                for m in resp.json()["messages"]:
+                    latencies.append(received - sent_at[m["text"]])
+                    texts.append(m["text"])
+                    after = m["id"]
+            expected = [f"{booking_id}:{i}" for i in range(n_messages)]
+            if texts != expected:
+                failures.append(f"room {booking_id} {who}: messages missing or out of order")
+
+        async def talk(clients, booking_id):
+            url = reverse("chat_send", args=[booking_id])
+            for i in range(n_messages):
+                text = f"{booking_id}:{i}"
+                sent_at[text] = time.perf_counter()
+                # Participants take turns so both directions are exercised
+                resp = await clients[i % 2].post(url, {"text": text}, content_type="application/json")
+                if resp.status_code != 201:
+                    failures.append(f"room {booking_id}: send returned {resp.status_code}")
+                await asyncio.sleep(interval)
+
+        async def watch():
+            nonlocal peak
+            while True:
+                peak = max(peak, hub.subscriber_count())
+                await asyncio.sleep(0.005)
+
+        rooms = []
+        for booking_id, customer, driver in bookings:
+            rooms.append((booking_id, (await client_for(customer), await client_for(driver))))
+
+        listeners = [
+            asyncio.ensure_future(listen(clients[k], booking_id, who))
+            for booking_id, clients in rooms
+            for k, who in enumerate(("customer", "driver"))
+        ]
+        watcher = asyncio.ensure_future(watch())
+        await asyncio.sleep(0.1)  # let every room subscribe first
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*listeners, *(talk(clients, booking_id) for booking_id, clients in rooms)),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            failures.append(f"gave up after {timeout}s")
+        finally:
+            watcher.cancel()
+            for task in listeners:
+                task.cancel()
+        return time.perf_counter() - start, latencies, failures, peak
+
+    def _report(self, n_rooms, n_messages, elapsed, latencies, failures, peak):
+        expected = n_rooms * n_messages * 2
+        self.stdout.write(
+            f"{n_rooms} rooms x {n_messages} messages, {len(latencies)}/{expected} deliveries in {elapsed:.2f}s "
+            f"({len(latencies) / elapsed:.0f}/s), peak {peak} waiting polls"
+        )
+        if latencies:
+            ordered = sorted(latencies)
+            self.stdout.write(
+                f"  latency ms: p50 {statistics.median(ordered) * 1000:.1f}, "
+                f"p95 {ordered[int(len(ordered) * 0.95) - 1] * 1000:.1f}, max {ordered[-1] * 1000:.1f}"
+            )
+        for failure in failures[:10]:
+            self.stdout.write(f"  {failure}")
+        if failures or len(latencies) != expected:
+            raise CommandError("Chat delivery was incomplete.")
+        self.stdout.write(self.style.SUCCESS("Every message reached both participants in order."))
@@ -0,0 +1,50 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dispatch import MODES, assign, candidate_pairs
+from core.utils import np
+
+
+class Command(BaseCommand):
+    help = "Time batch dispatch on a synthetic city (no database involved)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rides", type=int, default=10000)
+        parser.add_argument("--drivers", type=int, default=10000)
+        parser.add_argument("--radius", type=float, default=5)
+        parser.add_argument("--city-km", type=float, default=30, help="Side length of the square city.")
+        parser.add_argument("--max-candidates", type=int, default=20)
+        parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+
+    def handle(self, *args, **options):
+        rng = random.Random(7)
+        lat0, lng0 = 23.8103, 90.4125
+        span = options["city_km"] / 111.32
+
+        def points(n):
+            return [(i, lat0 + rng.uniform(0, span), lng0 + rng.uniform(0, span)) for i in range(n)]
+
+        rides, drivers = points(options["rides"]), points(options["drivers"])
+        self.stdout.write(
+            f"{len(rides)} rides x {len(drivers)} drivers, {options['city_km']:g} km city, "
+            f"radius {options['radius']:g} km, backend {'numpy' if np is not None else 'array'}"
+        )
+
+        start = time.perf_counter()
+        pairs = candidate_pairs(rides, drivers, options["radius"], options["max_candidates"])
+        self.stdout.write(f"  candidates: {len(pairs)} pairs in {time.perf_counter() - start:.2f}s")
+
+        for mode in options["modes"]:
+            start = time.perf_counter()
+            try:
+                matched = assign(rides, drivers, options["radius"], mode, options["max_candidates"])
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            elapsed = time.perf_counter() - start
+            total = sum(distance for _, _, distance in matched)
+            avg = total / len(matched) if matched else 0
+            self.stdout.write(
+                f"  {mode:<8} {len(matched)} matched, avg {avg:.3f} km, total {total:.0f} km in {elapsed:.2f}s"
+            )
@@ -0,0 +1,46 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.utils import batch_distances, calculate_distance, np, top_k
+
+
+class Command(BaseCommand):
+    help = "Compare scalar and batched haversine top-k over synthetic driver sets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("-k", type=int, default=10)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        k = options["k"]
+        lat0, lng0 = 23.8103, 90.4125
+        self.stdout.write(f"batch backend: {'numpy' if np is not None else 'array'}")
+        for n in options["sizes"]:
+            lats = [lat0 + rng.uniform(-0.5, 0.5) for _ in range(n)]
+            lngs = [lng0 + rng.uniform(-0.5, 0.5) for _ in range(n)]
+
+            def scalar():
+                pairs = [(calculate_distance(lat0, lng0, lat, lng), i) for i, (lat, lng) in enumerate(zip(lats, lngs))]
+                return [i for _, i in sorted(pairs)[:k]]
+
+            def batched():
+                return top_k(batch_distances(lat0, lng0, lats, lngs), k)
+
+            scalar_ms = self._best(scalar, options["repeat"])
+            batched_ms = self._best(batched, options["repeat"])
+            self.stdout.write(
+                f"{n:>7} drivers  scalar {scalar_ms:9.2f} ms  batched {batched_ms:9.2f} ms"
+                f"  x{scalar_ms / batched_ms:.1f}"
+            )
+
+    def _best(self, fn, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
@@ -0,0 +1,105 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, DriverReview, EmergencyAlert, EmergencyContact, RideRequest
+from utilities.models import Note
+
+
+def query_shapes(customer, driver):
+    """(label, index name, queryset) for the hot queries in core.views and utilities.views."""
+    return [
+        ("available rides", "ride_status_created_idx",
+         RideRequest.objects.filter(status="pending").exclude(booking__isnull=False).order_by("-created_at")[:20]),
+        ("customer rides", "ride_customer_created_idx",
+         RideRequest.objects.filter(customer=customer).order_by("-created_at")),
+        ("driver bookings", "booking_driver_confirmed_idx",
+         Booking.objects.filter(driver=driver).order_by("-confirmed_at")),
+        ("busy drivers", "booking_status_driver_idx",
+         Booking.objects.filter(status="ongoing").values_list("driver_id", flat=True)),
+        ("driver reviews", "review_driver_created_idx",
+         DriverReview.objects.filter(driver=driver).order_by("-created_at")),
+        ("emergency alerts", "alert_user_triggered_idx",
+         EmergencyAlert.objects.filter(user=customer).order_by("-triggered_at")[:20]),
+        ("recent notes", "note_user_updated_idx",
+         Note.objects.filter(user=customer).order_by("-updated_at")[:5]),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Seed a large scratch database and compare hot query plans and timings with and without the indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=2000)
+        parser.add_argument("--drivers", type=int, default=500)
+        parser.add_argument("--rides", type=int, default=100000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        with scratch_database(on_disk=True):
+            customer, driver = self._seed(options["customers"], options["drivers"], options["rides"])
+            shapes = query_shapes(customer, driver)
+            after = {label: self._measure(qs, options["repeat"]) for label, _, qs in shapes}
+            self._drop_indexes(shapes)
+            before = {label: self._measure(qs, options["repeat"]) for label, _, qs in shapes}
+
+        for label, index, _ in shapes:
+            (t0, plan0), (t1, plan1) = before[label], after[label]
+            self.stdout.write(f"{label} ({index}): {t0 * 1000:.2f} ms -> {t1 * 1000:.2f} ms ({t0 / t1:.1f}x)")
+            self.stdout.write(f"  without: {plan0}")
+            self.stdout.write(f"  with:    {plan1}")
+
+    def _seed(self, n_customers, n_drivers, n_rides):
+        rng = random.Random(7)
+        customers = Account.objects.bulk_create(
+            [Account(username=f"bench-customer-{i}", role="customer") for i in range(n_customers)], batch_size=1000
+        )
+        drivers = Account.objects.bulk_create(
+            [Account(username=f"bench-driver-{i}", role="driver") for i in range(n_drivers)], batch_size=1000
+        )
+        statuses = ["pending"] * 5 + ["accepted"] * 2 + ["completed"] * 90 + ["cancelled"] * 3
+        rides = RideRequest.objects.bulk_create([
+            RideRequest(customer=rng.choice(customers), pickup_location="A", dropoff_location="B", status=rng.choice(statuses))
+            for _ in range(n_rides)
+        ], batch_size=1000)
+        booking_status = {"accepted": "ongoing", "completed": "completed", "cancelled": "cancelled"}
+        bookings = Booking.objects.bulk_create([
+            Booking(ride_request=r, driver=rng.choice(drivers), status=booking_status[r.status])
+            for r in rides if r.status != "pending"
+        ], batch_size=1000)
+        DriverReview.objects.bulk_create([
+            DriverReview(booking=b, driver=b.driver, customer=b.ride_request.customer, rating=rng.randint(1, 5))
+            for b in bookings if b.status == "completed" and rng.random() < 0.5
+        ], batch_size=1000)
+        contacts = EmergencyContact.objects.bulk_create(
+            [EmergencyContact(user=c, phone_number="0") for c in customers], batch_size=1000
+        )
+        EmergencyAlert.objects.bulk_create(
+            [EmergencyAlert(user=c.user, contact=c) for c in contacts for _ in range(10)], batch_size=1000
+        )
+        Note.objects.bulk_create(
+            [Note(user=c, title="Note") for c in customers for _ in range(10)], batch_size=1000
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        return customers[0], drivers[0]
+
+    def _measure(self, queryset, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            list(queryset.all())
+            best = min(best, time.perf_counter() - start)
+        plan = " / ".join(line.strip(" |-`") for line in queryset.explain().splitlines() if line.strip())
+        return best, plan
+
+    def _drop_indexes(self, shapes):
+        with connection.schema_editor() as editor:
+            for _, name, qs in shapes:
+                model = qs.model
+                editor.remove_index(model, next(i for i in model._meta.indexes if i.name == name))
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
@@ -0,0 +1,95 @@
+import itertools
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, DriverProfile, RideRequest
+
+
+class Command(BaseCommand):
+    help = "Compare authenticated dashboard throughput across session engines and message storages."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Requests per view and configuration.")
+        parser.add_argument("--sessions", nargs="+", default=["db", "cached_db", "cache"])
+        parser.add_argument("--messages", nargs="+", default=["fallback", "cookie"])
+
+    def handle(self, *args, **options):
+        for name in options["sessions"]:
+            if name not in settings.SESSION_BACKENDS:
+                raise CommandError(f"Unknown session backend {name!r}.")
+        for name in options["messages"]:
+            if name not in settings.MESSAGE_BACKENDS:
+                raise CommandError(f"Unknown message storage {name!r}.")
+
+        with scratch_database():
+            customer, driver = self._seed()
+            self.stdout.write(f"{'sessions/messages':<24} {'view':<22} {'req/s':>8} {'session queries':>16}")
+            for engine, storage in itertools.product(options["sessions"], options["messages"]):
+                caches[settings.SESSION_CACHE_ALIAS].clear()
+                with override_settings(
+                    SESSION_ENGINE=settings.SESSION_BACKENDS[engine],
+                    MESSAGE_STORAGE=settings.MESSAGE_BACKENDS[storage],
+                ):
+                    results = self._run(customer, driver, options["requests"])
+                for view, (rate, session_queries) in results.items():
+                    self.stdout.write(f"{engine + '/' + storage:<24} {view:<22} {rate:>8.0f} {session_queries:>16}")
+
+    def _seed(self):
+        lat, lng = 23.8103, 90.4125
+        customer = Account.objects.create(username="bench-customer", role="customer", last_lat=lat, last_lng=lng)
+        driver = Account.objects.create(username="bench-driver", role="driver", last_lat=lat, last_lng=lng)
+        DriverProfile.objects.create(
+            user=driver, nid_number="1", license_number="1", vehicle_details="Car",
+            current_lat=lat, current_lng=lng, availability="online", location_updated_at=timezone.now(),
+        )
+        for i in range(10):
+            ride = RideRequest.objects.create(
+                customer=customer, pickup_location=f"P{i}", dropoff_location=f"D{i}", status="completed",
+            )
+            Booking.objects.create(ride_request=ride, driver=driver, status="completed")
+            RideRequest.objects.create(
+                customer=customer, pickup_location=f"Q{i}", dropoff_location=f"E{i}",
+                pickup_lat=lat, pickup_lng=lng + 0.001 * i,
+            )
+        return customer, driver
+
+    def _run(self, customer, driver, n_requests):
+        dashboard = reverse("driver_dashboard")
+        flash_post = (reverse("update_location"), {"lat": 23.81, "lng": 90.41, "next": dashboard})
+        workloads = {
+            "customer_dashboard": (customer, lambda c: c.get(reverse("customer_dashboard"))),
+            "driver_dashboard": (driver, lambda c: c.get(dashboard)),
+            # POST that flashes a message, then the GET that shows it
+            "flash + redirect": (driver, lambda c: c.post(*flash_post, follow=True)),
+        }
+        results = {}
+        for view, (user, request) in workloads.items():
+            client = Client()
+            client.force_login(user)
+            request(client)  # warm caches and the session
+
+            session_queries = 0
+
+            def count(execute, sql, params, many, context):
+                nonlocal session_queries
+                session_queries += "django_session" in sql
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                for _ in range(n_requests):
+                    resp = request(client)
+                    if resp.status_code != 200:
+                        raise CommandError(f"{view}: returned {resp.status_code}")
+                elapsed = time.perf_counter() - start
+            results[view] = (n_requests / elapsed, session_queries)
+        return results
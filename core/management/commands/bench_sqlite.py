@@ -0,0 +1,98 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections, transaction
+from django.test.utils import override_settings
+
+from core.management.scratch import scratch_database
+from core.models import Account, RideRequest
+
+
+class Command(BaseCommand):
+    help = "Compare the DB_PROFILES under concurrent writers (location pings, ride requests) and readers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--requests", type=int, default=300, help="Requests per thread.")
+        parser.add_argument("--profiles", nargs="+", default=list(settings.DB_PROFILES))
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("This benchmark is for SQLite.")
+        for name in options["profiles"]:
+            if name not in settings.DB_PROFILES:
+                raise CommandError(f"Unknown DB profile {name!r}.")
+            profile = settings.DB_PROFILES[name]
+            old_max_age = connection.settings_dict["CONN_MAX_AGE"]
+            connection.settings_dict["CONN_MAX_AGE"] = profile["CONN_MAX_AGE"]
+            try:
+                with override_settings(DB_PROFILE=name), scratch_database(on_disk=True):
+                    elapsed, outcomes = self._run(options["writers"], options["readers"], options["requests"])
+            finally:
+                connection.settings_dict["CONN_MAX_AGE"] = old_max_age
+            total = sum(outcomes.values())
+            self.stdout.write(f"{name}: {total} requests in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+            for outcome, count in outcomes.most_common():
+                self.stdout.write(f"  {outcome}: {count}")
+
+    def _run(self, n_writers, n_readers, n_requests):
+        users = Account.objects.bulk_create(
+            [Account(username=f"bench-user-{i}", role="customer") for i in range(200)]
+        )
+        user_ids = [u.pk for u in users]
+        connections.close_all()
+
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(n_writers + n_readers)
+
+        def write(rng):
+            if rng.random() < 0.9:
+                # Location ping
+                Account.objects.filter(pk=rng.choice(user_ids)).update(
+                    last_lat=rng.uniform(23, 24), last_lng=rng.uniform(90, 91)
+                )
+            else:
+                # Ride request created and accepted in one transaction
+                with transaction.atomic():
+                    ride = RideRequest.objects.create(
+                        customer_id=rng.choice(user_ids), pickup_location="A", dropoff_location="B"
+                    )
+                    ride.status = "accepted"
+                    ride.save(update_fields=["status"])
+
+        def read(rng):
+            list(RideRequest.objects.filter(status="pending").order_by("-created_at")[:20])
+            Account.objects.filter(pk=rng.choice(user_ids)).first()
+
+        def worker(seed, op):
+            rng = random.Random(seed)
+            barrier.wait()
+            try:
+                for _ in range(n_requests):
+                    # Same connection handling as a request/response cycle
+                    close_old_connections()
+                    try:
+                        op(rng)
+                        outcome = "ok"
+                    except OperationalError as e:
+                        outcome = f"error: {e}"
+                    close_old_connections()
+                    with lock:
+                        outcomes[f"{op.__name__} {outcome}"] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(i, write)) for i in range(n_writers)]
+        threads += [threading.Thread(target=worker, args=(n_writers + i, read)) for i in range(n_readers)]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return time.perf_counter() - start, outcomes
@@ -0,0 +1,126 @@
+import time
+from copy import deepcopy
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.leaderboard import leaderboard_page_context
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, DriverProfile, DriverReview, DriverStats, RideOffer, RideRequest
+from core.pagination import Page
+
+DUMMY_CACHE = {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+
+
+def uncached_templates():
+    """TEMPLATES as configured, minus the cached loader."""
+    templates = deepcopy(settings.TEMPLATES)
+    for engine in templates:
+        loaders = engine["OPTIONS"].get("loaders", [])
+        engine["OPTIONS"]["loaders"] = [
+            name for loader in loaders
+            for name in (loader[1] if loader[0].endswith("cached.Loader") else [loader])
+        ]
+    return templates
+
+
+class Command(BaseCommand):
+    help = "Time template rendering with and without the cached loader and {% cache %} fragments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20, help="Rows per list in the dashboard contexts.")
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        profiles = [
+            ("uncached loader", {"TEMPLATES": uncached_templates(), "CACHES": {**settings.CACHES, "template_fragments": DUMMY_CACHE}}),
+            ("cached loader", {"CACHES": {**settings.CACHES, "template_fragments": DUMMY_CACHE}}),
+            ("cached + fragments", {}),
+        ]
+        with scratch_database():
+            pages = self._seed(options["rows"])
+            results = {}
+            for label, overrides in profiles:
+                with override_settings(**overrides):
+                    caches["template_fragments"].clear()
+                    for name, request, context in pages:
+                        results[label, name] = self._measure(name, request, context, options["repeat"])
+
+        self.stdout.write(f"{'template':<28}" + "".join(f"{label:>22}" for label, _ in profiles))
+        for name, _, _ in pages:
+            row = "".join(f"{results[label, name] * 1000:>19.3f} ms" for label, _ in profiles)
+            self.stdout.write(f"{name:<28}{row}")
+
+    def _seed(self, n):
+        lat, lng = 23.8103, 90.4125
+        customer = Account.objects.create(username="bench-customer", role="customer", last_lat=lat, last_lng=lng)
+        driver = Account.objects.create(username="bench-driver", role="driver")
+        profile = DriverProfile.objects.create(
+            user=driver, nid_number="1", license_number="1", vehicle_details="Car", full_name="Bench Driver",
+            current_lat=lat, current_lng=lng, availability="online", location_updated_at=timezone.now(),
+        )
+        for i in range(n):
+            status = ("completed", "ongoing", "cancelled")[i % 3]
+            ride = RideRequest.objects.create(
+                customer=customer, pickup_location=f"Pickup {i}", dropoff_location=f"Dropoff {i}",
+                status="accepted" if status == "ongoing" else status,
+            )
+            booking = Booking.objects.create(ride_request=ride, driver=driver, status=status)
+            if status == "completed":
+                DriverReview.objects.create(booking=booking, driver=driver, customer=customer, rating=1 + i % 5, feedback="Good")
+            pending = RideRequest.objects.create(
+                customer=customer, pickup_location=f"Pending {i}", dropoff_location=f"Drop {i}",
+                pickup_lat=lat, pickup_lng=lng + 0.001 * i,
+            )
+            RideOffer.objects.create(ride_request=pending, driver=driver, distance_km=1)
+
+        rides = RideRequest.objects.filter(customer=customer).select_related("booking").order_by("-created_at")
+        customer_bookings = Booking.objects.filter(ride_request__customer=customer).select_related("ride_request", "review")
+        driver.driverprofile = profile
+        stats = DriverStats.objects.get(driver=driver)
+        pending = RideRequest.objects.filter(status="pending").order_by("-created_at")
+
+        factory = RequestFactory()
+
+        def request_for(user):
+            request = factory.get("/")
+            request.user = user
+            return request
+
+        return [
+            ("index.html", request_for(AnonymousUser()), {}),
+            ("leaderboard.html", request_for(customer), leaderboard_page_context()),
+            ("customer_dashboard.html", request_for(customer), {
+                "rides": Page(list(rides), None, "rides_after"),
+                "customer_bookings": Page(list(customer_bookings), None, "bookings_after"),
+                "nearby_drivers": [
+                    {"user": driver, "vehicle_details": "Car", "distance_km": 0.5 * i} for i in range(10)
+                ],
+            }),
+            ("driver_dashboard.html", request_for(driver), {
+                "bookings": Page(list(Booking.objects.filter(driver=driver).select_related("ride_request")), None, "bookings_after"),
+                "available_rides": list(pending[:20]),
+                "nearby_rides": [
+                    {"ride": {"id": r.id, "pickup_location": r.pickup_location, "dropoff_location": r.dropoff_location}, "distance_km": 1.0}
+                    for r in pending[:10]
+                ],
+                "offers": list(RideOffer.objects.filter(driver=driver).select_related("ride_request")),
+                "reviews": Page(list(DriverReview.objects.filter(driver=driver)), None, "reviews_after"),
+                "avg_rating": 3.0,
+                "total_completed": stats.completed_count,
+                "total_ongoing": stats.ongoing_count,
+            }),
+        ]
+
+    def _measure(self, name, request, context, repeat):
+        render_to_string(name, context, request)  # warm whatever this profile caches
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render_to_string(name, context, request)
+        return (time.perf_counter() - start) / repeat
@@ -0,0 +1,110 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.scratch import scratch_database
+from core.models import Account, Booking, ChatMessage, DriverProfile, DriverReview, RideOffer, RideRequest
+
+# Maximum queries per view, whatever the number of rows on the page.
+# Raise a budget only together with the change that needs it.
+BUDGETS = {
+    "customer_dashboard": 5,
+    "driver_dashboard": 9,
+    "list_my_bookings (driver)": 4,
+    "list_my_bookings (customer)": 4,
+    "list_driver_reviews": 4,
+    "chat_room": 4,
+}
+
+
+def seed_world(tag, n):
+    """Seed one user pair with n rows per list; returns {view name: (user, url)} for BUDGETS."""
+    lat, lng = 23.8103, 90.4125
+    customer = Account.objects.create(username=f"{tag}-customer", role="customer", last_lat=lat, last_lng=lng)
+    driver = Account.objects.create(username=f"{tag}-driver", role="driver")
+    DriverProfile.objects.create(
+        user=driver, nid_number="1", license_number="1", vehicle_details="Car",
+        current_lat=lat + 0.01, current_lng=lng,
+    )
+    for i in range(n):
+        other = Account.objects.create(username=f"{tag}-nearby-{i}", role="driver")
+        DriverProfile.objects.create(
+            user=other, vehicle_details="Car", current_lat=lat + 0.001 * i, current_lng=lng,
+            availability="online", location_updated_at=timezone.now(),
+        )
+
+    for i in range(n):
+        status = ("completed", "ongoing", "cancelled")[i % 3]
+        ride = RideRequest.objects.create(
+            customer=customer, pickup_location=f"P{i}", dropoff_location=f"D{i}",
+            status="accepted" if status == "ongoing" else status,
+        )
+        booking = Booking.objects.create(ride_request=ride, driver=driver, status=status)
+        if status == "completed":
+            DriverReview.objects.create(booking=booking, driver=driver, customer=customer, rating=1 + i % 5)
+    for i in range(n):
+        ride = RideRequest.objects.create(
+            customer=customer, pickup_location=f"Q{i}", dropoff_location=f"E{i}",
+            pickup_lat=lat, pickup_lng=lng + 0.001 * i,
+        )
+        RideOffer.objects.create(ride_request=ride, driver=driver, distance_km=1)
+
+    chat = Booking.objects.filter(driver=driver, status="ongoing").first()
+    ChatMessage.objects.bulk_create([
+        ChatMessage(booking=chat, sender=(customer, driver)[i % 2], text=f"m{i}") for i in range(n)
+    ])
+    return {
+        "customer_dashboard": (customer, reverse("customer_dashboard")),
+        "driver_dashboard": (driver, reverse("driver_dashboard")),
+        "list_my_bookings (driver)": (driver, reverse("list_my_bookings")),
+        "list_my_bookings (customer)": (customer, reverse("list_my_bookings")),
+        "list_driver_reviews": (customer, reverse("list_driver_reviews", args=[driver.id])),
+        "chat_room": (customer, reverse("chat_room", args=[chat.id])),
+    }
+
+
+class Command(BaseCommand):
+    help = "Check that the dashboard views stay within a fixed query budget as data grows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs=2, default=[3, 40], help="Rows per list in the two datasets.")
+        parser.add_argument("--verbose-sql", action="store_true", help="Print the queries of every view.")
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            worlds = [seed_world(f"s{n}", n) for n in options["sizes"]]
+            counts = [self._measure(world, options["verbose_sql"]) for world in worlds]
+
+        failed = False
+        sizes = options["sizes"]
+        self.stdout.write(f"{'view':<30} {'budget':>6} " + " ".join(f"{f'n={n}':>6}" for n in sizes))
+        for name, budget in BUDGETS.items():
+            row = [c[name] for c in counts]
+            ok = max(row) <= budget and len(set(row)) == 1
+            failed |= not ok
+            line = f"{name:<30} {budget:>6} " + " ".join(f"{c:>6}" for c in row)
+            self.stdout.write(line if ok else self.style.ERROR(line + "  <- over budget or grows with rows"))
+        if failed:
+            raise CommandError("Query budget exceeded.")
+        self.stdout.write(self.style.SUCCESS("All views within budget."))
+
+    def _measure(self, world, verbose):
+        counts = {}
+        for name, (user, url) in world.items():
+            client = Client()
+            client.force_login(user)
+            # Warm per-process caches (live locations, leaderboard) first
+            client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                resp = client.get(url)
+            if resp.status_code != 200:
+                raise CommandError(f"{name}: GET {url} returned {resp.status_code}")
+            counts[name] = len(ctx.captured_queries)
+            if verbose:
+                self.stdout.write(f"-- {name} ({url})")
+                for q in ctx.captured_queries:
+                    self.stdout.write(f"   {q['sql'][:160]}")
+        return counts
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dispatch import MODES, dispatch, get_setting
+
+
+class Command(BaseCommand):
+    help = "Match pending rides to nearby available drivers and offer them the rides."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--radius", type=float, default=None, help="Search radius in km.")
+        parser.add_argument("--mode", choices=MODES, default=None)
+        parser.add_argument("--interval", type=float, default=0, help="Repeat every N seconds.")
+        parser.add_argument("--dry-run", action="store_true", help="Print matches without writing offers.")
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            try:
+                assignments = dispatch(
+                    radius_km=options["radius"],
+                    mode=options["mode"],
+                    commit=not options["dry_run"],
+                )
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            elapsed = (time.perf_counter() - start) * 1000
+            mode = options["mode"] or get_setting("MODE")
+            self.stdout.write(f"[{mode}] offered {len(assignments)} rides in {elapsed:.0f} ms")
+            if options["dry_run"]:
+                for ride_id, driver_id, distance in assignments:
+                    self.stdout.write(f"  ride {ride_id} -> driver {driver_id} ({distance:.2f} km)")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.geocoding import TARGETS, geocode_rows, pending_rows
+
+
+class Command(BaseCommand):
+    help = "Geocode driver profiles and ride requests that still have no coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows per model.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for label in TARGETS:
+            pks = list(pending_rows(label).order_by("pk").values_list("pk", flat=True)[:options["limit"]])
+            filled = 0
+            for start in range(0, len(pks), batch_size):
+                batch = pending_rows(label).filter(pk__in=pks[start:start + batch_size])
+                filled += geocode_rows(list(batch))
+            self.stdout.write(f"{label}: geocoded {filled} of {len(pks)} rows")
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.images import TARGETS, pending_rows, process_rows
+
+
+class Command(BaseCommand):
+    help = "Re-encode uploaded profile pictures and review images that have no thumbnail yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--limit", type=int, default=None, help="Stop after this many rows per model.")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        for label in TARGETS:
+            pks = list(pending_rows(label).order_by("pk").values_list("pk", flat=True)[:options["limit"]])
+            done = 0
+            for start in range(0, len(pks), batch_size):
+                done += process_rows(label, pks[start:start + batch_size])
+            self.stdout.write(f"{label}: processed {done} of {len(pks)} rows")
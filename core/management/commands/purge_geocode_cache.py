@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from core.geocoding import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Delete expired entries from the geocode cache table."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Purged {purge_expired()} expired geocode entries.")
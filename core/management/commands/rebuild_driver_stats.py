@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild_driver_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the DriverStats counters from bookings and reviews."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Rebuilt stats for {rebuild_driver_stats()} drivers.")
@@ -0,0 +1,31 @@
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.db import connection
+
+
+@contextmanager
+def scratch_database(on_disk=False):
+    """Run a benchmark against a freshly migrated throwaway database.
+
+    The real database is never touched. SQLite test databases live in memory
+    by default; on_disk=True puts this one in a temp file instead so that
+    concurrent writers behave like they do in production.
+    """
+    old_name = connection.settings_dict["NAME"]
+    test_settings = connection.settings_dict["TEST"]
+    old_test_name = test_settings.get("NAME")
+    tmpdir = None
+    if on_disk and connection.vendor == "sqlite":
+        tmpdir = tempfile.mkdtemp(prefix="rentadriver-")
+        test_settings["NAME"] = str(Path(tmpdir) / "scratch.sqlite3")
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings["NAME"] = old_test_name
+        if tmpdir:
+            shutil.rmtree(tmpdir, ignore_errors=True)
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+from core.utils import cell_for
+
+
+def populate_geo_cells(apps, schema_editor):
+    DriverProfile = apps.get_model("core", "DriverProfile")
+    profiles = list(DriverProfile.objects.filter(current_lat__isnull=False, current_lng__isnull=False))
+    for profile in profiles:
+        profile.geo_cell = cell_for(profile.current_lat, profile.current_lng)
+    DriverProfile.objects.bulk_update(profiles, ["geo_cell"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverprofile',
+            name='geo_cell',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(populate_geo_cells, migrations.RunPython.noop),
+    ]
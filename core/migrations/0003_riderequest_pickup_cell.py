@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:35
+
+from django.db import migrations, models
+
+from core.utils import cell_for
+
+
+def populate_pickup_cells(apps, schema_editor):
+    RideRequest = apps.get_model("core", "RideRequest")
+    rides = list(RideRequest.objects.filter(status="pending", pickup_lat__isnull=False, pickup_lng__isnull=False))
+    for ride in rides:
+        ride.pickup_cell = cell_for(ride.pickup_lat, ride.pickup_lng)
+    RideRequest.objects.bulk_update(rides, ["pickup_cell"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_driverprofile_geo_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riderequest',
+            name='pickup_cell',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='riderequest',
+            index=models.Index(fields=['status', 'pickup_cell'], name='ride_status_cell_idx'),
+        ),
+        migrations.RunPython(populate_pickup_cells, migrations.RunPython.noop),
+    ]
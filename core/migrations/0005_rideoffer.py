@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_geocodecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RideOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance_km', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ride_offers', to=settings.AUTH_USER_MODEL)),
+                ('ride_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='offers', to='core.riderequest')),
+            ],
+            options={
+                'unique_together': {('ride_request', 'driver')},
+            },
+        ),
+    ]
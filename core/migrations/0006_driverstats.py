@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_driver_stats(apps, schema_editor):
+    Account = apps.get_model("core", "Account")
+    Booking = apps.get_model("core", "Booking")
+    DriverReview = apps.get_model("core", "DriverReview")
+    DriverStats = apps.get_model("core", "DriverStats")
+    stats = {
+        driver_id: DriverStats(driver_id=driver_id)
+        for driver_id in Account.objects.filter(role="driver").values_list("id", flat=True)
+    }
+    for row in Booking.objects.values("driver_id").annotate(
+        completed=Count("id", filter=Q(status="completed")),
+        ongoing=Count("id", filter=Q(status="ongoing")),
+    ):
+        s = stats.setdefault(row["driver_id"], DriverStats(driver_id=row["driver_id"]))
+        s.completed_count, s.ongoing_count = row["completed"], row["ongoing"]
+    for row in DriverReview.objects.values("driver_id").annotate(total=Sum("rating"), n=Count("id")):
+        s = stats.setdefault(row["driver_id"], DriverStats(driver_id=row["driver_id"]))
+        s.rating_sum, s.rating_count = row["total"], row["n"]
+    DriverStats.objects.bulk_create(stats.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_rideoffer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverStats',
+            fields=[
+                ('driver', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('ongoing_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-completed_count'], name='driverstats_completed_idx')],
+            },
+        ),
+        migrations.RunPython(populate_driver_stats, migrations.RunPython.noop),
+    ]
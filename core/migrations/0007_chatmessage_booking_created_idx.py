@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_driverstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['booking', 'created_at', 'id'], name='chat_booking_created_idx'),
+        ),
+    ]
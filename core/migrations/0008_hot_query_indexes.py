@@ -0,0 +1,37 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_chatmessage_booking_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['driver', '-confirmed_at'], name='booking_driver_confirmed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'driver'], name='booking_status_driver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='driverreview',
+            index=models.Index(fields=['driver', '-created_at'], name='review_driver_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emergencyalert',
+            index=models.Index(fields=['user', '-triggered_at'], name='alert_user_triggered_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riderequest',
+            index=models.Index(fields=['status', '-created_at'], name='ride_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riderequest',
+            index=models.Index(fields=['customer', '-created_at'], name='ride_customer_created_idx'),
+        ),
+    ]
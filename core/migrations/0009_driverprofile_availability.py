@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+def populate_availability(apps, schema_editor):
+    Booking = apps.get_model("core", "Booking")
+    DriverProfile = apps.get_model("core", "DriverProfile")
+    busy = Booking.objects.filter(status="ongoing").values("driver_id")
+    DriverProfile.objects.filter(user_id__in=busy).update(availability="busy")
+    # No timestamps exist yet, so these only show up again once they ping
+    DriverProfile.objects.exclude(user_id__in=busy).filter(
+        current_lat__isnull=False, current_lng__isnull=False
+    ).update(availability="online")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverprofile',
+            name='availability',
+            field=models.CharField(choices=[('online', 'Online'), ('busy', 'Busy'), ('offline', 'Offline')], default='offline', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='driverprofile',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='driverprofile',
+            index=models.Index(fields=['availability', 'geo_cell'], name='driver_avail_cell_idx'),
+        ),
+        migrations.RunPython(populate_availability, migrations.RunPython.noop),
+    ]
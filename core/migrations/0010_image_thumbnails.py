@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-18 15:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_driverprofile_availability'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='driverprofile',
+            name='profile_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='profiles/thumbs/'),
+        ),
+        migrations.AddField(
+            model_name='driverreview',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='reviews/thumbs/'),
+        ),
+    ]
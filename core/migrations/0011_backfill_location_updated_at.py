@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_location_updated_at(apps, schema_editor):
+    # 0009 marked drivers with coordinates online but left them without a
+    # timestamp, which hides them everywhere; start their STALE_AFTER window now
+    DriverProfile = apps.get_model("core", "DriverProfile")
+    DriverProfile.objects.filter(
+        location_updated_at__isnull=True, current_lat__isnull=False, current_lng__isnull=False
+    ).update(location_updated_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_location_updated_at, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,9 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+
+from .utils import cell_for
 
 
 # Custom User Model
@@ -30,9 +33,49 @@ class DriverProfile(models.Model):
 
     nid_number = models.CharField(max_length=50, null=True, blank=True)
     profile_picture = models.ImageField(upload_to="profiles/", null=True, blank=True)
+    # Small WebP copy made by core.images after upload; pages show this one
+    profile_thumbnail = models.ImageField(upload_to="profiles/thumbs/", null=True, blank=True, editable=False)
 
     current_lat = models.FloatField(null=True, blank=True)
     current_lng = models.FloatField(null=True, blank=True)
+    # Grid cell of the current position, kept in sync on save for nearby lookups
+    geo_cell = models.CharField(max_length=32, blank=True, default="", db_index=True, editable=False)
+    # When the driver last reported a position; older than STALE_AFTER means gone
+    location_updated_at = models.DateTimeField(null=True, blank=True, editable=False)
+    AVAILABILITY_CHOICES = (
+        ("online", "Online"),
+        ("busy", "Busy"),
+        ("offline", "Offline"),
+    )
+    # online: pinged and free; busy: has an ongoing booking (see core.signals)
+    availability = models.CharField(max_length=10, choices=AVAILABILITY_CHOICES, default="offline", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["availability", "geo_cell"], name="driver_avail_cell_idx"),
+        ]
+
+    def move_to(self, lat, lng):
+        """Record a position reported by the driver.
+
+        Availability is left alone; pings switch it with a conditional
+        update (core.locations.bring_online) so a concurrent busy is kept.
+        """
+        self.current_lat = lat
+        self.current_lng = lng
+        self.location_updated_at = timezone.now()
+
+    @property
+    def profile_picture_small(self):
+        """The thumbnail, or the original until the thumbnail is ready."""
+        return self.profile_thumbnail or self.profile_picture
+
+    def save(self, *args, **kwargs):
+        self.geo_cell = cell_for(self.current_lat, self.current_lng) or ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"current_lat", "current_lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "geo_cell"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.user.username
@@ -47,6 +90,27 @@ class RideRequest(models.Model):
     pickup_lng = models.FloatField(null=True, blank=True)
     status = models.CharField(max_length=20, default="pending")
     created_at = models.DateTimeField(auto_now_add=True) 
+    # Grid cell of the pickup point; only set while the ride is pending
+    pickup_cell = models.CharField(max_length=32, blank=True, default="", editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "pickup_cell"], name="ride_status_cell_idx"),
+            # Available rides list: status="pending" newest first
+            models.Index(fields=["status", "-created_at"], name="ride_status_created_idx"),
+            # Customer dashboard: own rides newest first
+            models.Index(fields=["customer", "-created_at"], name="ride_customer_created_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.status == "pending":
+            self.pickup_cell = cell_for(self.pickup_lat, self.pickup_lng) or ""
+        else:
+            self.pickup_cell = ""
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"status", "pickup_lat", "pickup_lng"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "pickup_cell"}
+        super().save(*args, **kwargs)
    
     def __str__(self):
         return f"Ride by {self.customer.username}"
@@ -63,10 +127,53 @@ class Booking(models.Model):
         default='ongoing'
     )
 
+    class Meta:
+        indexes = [
+            # Driver dashboard / my bookings: a driver's bookings newest first
+            models.Index(fields=["driver", "-confirmed_at"], name="booking_driver_confirmed_idx"),
+            # Busy drivers for dispatch: status="ongoing" → driver_id, read from the index alone
+            models.Index(fields=["status", "driver"], name="booking_status_driver_idx"),
+        ]
+
     def __str__(self):
         return f"Booking {self.id} - {self.ride_request.customer.username} with {self.driver.username}"
 
 
+# Ride Offer (written by the dispatcher, see core.dispatch)
+class RideOffer(models.Model):
+    ride_request = models.ForeignKey(RideRequest, on_delete=models.CASCADE, related_name="offers")
+    driver = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="ride_offers")
+    distance_km = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("ride_request", "driver")
+
+    def __str__(self):
+        return f"Ride {self.ride_request_id} offered to {self.driver.username}"
+
+
+# Driver Stats (counters kept up to date by core.signals)
+class DriverStats(models.Model):
+    driver = models.OneToOneField(Account, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    completed_count = models.PositiveIntegerField(default=0)
+    ongoing_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-completed_count"], name="driverstats_completed_idx"),
+        ]
+
+    @property
+    def avg_rating(self):
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    def __str__(self):
+        return f"Stats for {self.driver.username}"
+
+
 # Emergency Contact
 class EmergencyContact(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="emergency_contact")
@@ -88,6 +195,11 @@ class EmergencyAlert(models.Model):
         default="sent"
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-triggered_at"], name="alert_user_triggered_idx"),
+        ]
+
     def __str__(self):
         return f"Alert by {self.user.username} to {self.contact.phone_number} at {self.triggered_at}"
 
@@ -99,8 +211,18 @@ class DriverReview(models.Model):
     rating = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])  
     feedback = models.TextField(blank=True)
     image = models.ImageField(upload_to="reviews/", null=True, blank=True)
+    image_thumbnail = models.ImageField(upload_to="reviews/thumbs/", null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["driver", "-created_at"], name="review_driver_created_idx"),
+        ]
+
+    @property
+    def image_small(self):
+        return self.image_thumbnail or self.image
+
     def __str__(self):
         return f"{self.customer.username} → {self.driver.username} ({self.rating}⭐)"
 
@@ -114,6 +236,22 @@ class ChatMessage(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Keyset pagination of a booking's history (see core.chat.history_query)
+            models.Index(fields=["booking", "created_at", "id"], name="chat_booking_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.text[:20]}..."
+
+
+
+# Geocode Cache
+class GeocodeCache(models.Model):
+    address_key = models.CharField(max_length=255, unique=True)
+    lat = models.FloatField(null=True, blank=True)
+    lng = models.FloatField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.address_key} → {self.lat}, {self.lng}"
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.http import QueryDict
+from django.utils.dateparse import parse_datetime
+
+DEFAULTS = {
+    "PAGE_SIZE": 20,
+}
+
+
+def get_setting(name):
+    return getattr(settings, "PAGINATION", {}).get(name, DEFAULTS[name])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(value, pk):
+    raw = json.dumps([value.isoformat(), pk], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        value, pk = json.loads(raw)
+        value = parse_datetime(value)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursor(token) from e
+    if value is None or not isinstance(pk, int):
+        raise InvalidCursor(token)
+    return value, pk
+
+
+class Page:
+    """One newest-first page; next_cursor is None on the last page."""
+
+    def __init__(self, items, next_cursor, param="after", query=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.param = param
+        self._query = query
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def next_query(self):
+        """The current query string with this page's cursor moved forward."""
+        query = self._query.copy() if self._query is not None else QueryDict(mutable=True)
+        query[self.param] = self.next_cursor
+        return query.urlencode()
+
+
+def paginate(queryset, field, cursor=None, limit=None):
+    """Keyset page of queryset, newest first on (field, id).
+
+    cursor is a token from a previous page's next_cursor. Cost does not grow
+    with how far back the page is, as long as (…, field, id) is indexed.
+    Returns (items, next_cursor); raises InvalidCursor on a bad token.
+    """
+    limit = limit or get_setting("PAGE_SIZE")
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        # Same shape as core.chat.history_query: a range the index can serve, ties cut by id
+        queryset = queryset.filter(**{f"{field}__lte": value}).exclude(**{field: value, "id__gte": pk})
+    rows = list(queryset.order_by(f"-{field}", "-id")[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if isinstance(last, dict):  # .values() querysets
+            next_cursor = encode_cursor(last[field], last["id"])
+        else:
+            next_cursor = encode_cursor(getattr(last, field), last.pk)
+    return rows, next_cursor
+
+
+def paginate_request(request, queryset, field, param="after", limit=None):
+    """paginate() driven by ?<param>=; a bad token falls back to the first page."""
+    try:
+        rows, next_cursor = paginate(queryset, field, request.GET.get(param), limit)
+    except InvalidCursor:
+        rows, next_cursor = paginate(queryset, field, None, limit)
+    return Page(rows, next_cursor, param, request.GET)
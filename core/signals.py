@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import etags
+from .chat import hub as chat_hub
+from .leaderboard import invalidate_leaderboard
+from .locations import refresh_availability
+from .models import Account, Booking, ChatMessage, DriverProfile, DriverReview, DriverStats, RideOffer, RideRequest
+from .stats import STATUS_COUNTERS, bump, status_deltas
+from .utils import calculate_distance
+
+
+@receiver(connection_created)
+def setup_sqlite_connection(sender, connection, **kwargs):
+    # Tuning from the active DB_PROFILE; journal_mode=WAL sticks to the file,
+    # the rest only lasts as long as this connection
+    if connection.vendor != "sqlite":
+        return
+    pragmas = settings.DB_PROFILES.get(settings.DB_PROFILE, {}).get("PRAGMAS", {})
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+    # SQL-side distance for core.geo.Haversine
+    connection.connection.create_function("HAVERSINE_KM", 4, calculate_distance, deterministic=True)
+
+
+@receiver(post_save, sender=Account)
+def create_driver_stats(sender, instance, created, **kwargs):
+    if created and instance.role == "driver":
+        DriverStats.objects.get_or_create(driver=instance)
+        transaction.on_commit(invalidate_leaderboard)
+
+
+@receiver(post_init, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    # Status as loaded, so post_save can tell what changed without a query
+    instance._stats_status = instance.status
+
+
+@receiver(post_save, sender=Booking)
+def count_booking_status(sender, instance, created, **kwargs):
+    old_status = None if created else instance._stats_status
+    if old_status != instance.status:
+        bump(instance.driver_id, **status_deltas(old_status, instance.status))
+        if "completed" in (old_status, instance.status):
+            transaction.on_commit(invalidate_leaderboard)
+        if "ongoing" in (old_status, instance.status):
+            refresh_availability(instance.driver_id)
+        instance._stats_status = instance.status
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_booking(sender, instance, **kwargs):
+    if instance._stats_status in STATUS_COUNTERS:
+        bump(instance.driver_id, **{STATUS_COUNTERS[instance._stats_status]: -1})
+        if instance._stats_status == "completed":
+            transaction.on_commit(invalidate_leaderboard)
+        elif instance._stats_status == "ongoing":
+            refresh_availability(instance.driver_id)
+
+
+@receiver(post_init, sender=DriverReview)
+def remember_review_rating(sender, instance, **kwargs):
+    # Driver and rating as loaded, so edits move the stats by the difference
+    instance._stats_rating = (instance.driver_id, instance.rating)
+
+
+@receiver(post_save, sender=DriverReview)
+def count_review(sender, instance, created, **kwargs):
+    current = (instance.driver_id, instance.rating)
+    old_driver_id, old_rating = instance._stats_rating
+    if created:
+        bump(instance.driver_id, rating_sum=instance.rating, rating_count=1)
+    elif current == instance._stats_rating:
+        return
+    elif old_driver_id == instance.driver_id:
+        bump(instance.driver_id, rating_sum=instance.rating - old_rating)
+    else:
+        bump(old_driver_id, rating_sum=-old_rating, rating_count=-1)
+        bump(instance.driver_id, rating_sum=instance.rating, rating_count=1)
+    instance._stats_rating = current
+    transaction.on_commit(invalidate_leaderboard)
+
+
+@receiver(post_delete, sender=DriverReview)
+def uncount_review(sender, instance, **kwargs):
+    driver_id, rating = instance._stats_rating
+    bump(driver_id, rating_sum=-rating, rating_count=-1)
+    transaction.on_commit(invalidate_leaderboard)
+
+
+@receiver(post_save, sender=ChatMessage)
+def announce_chat_message(sender, instance, created, **kwargs):
+    # Wake long-polls only once the message is visible to their query
+    if created:
+        booking_id = instance.booking_id
+        transaction.on_commit(lambda: chat_hub.publish(booking_id))
+
+
+# ---------- Conditional GET versions (core.etags) ----------
+
+@receiver([post_save, post_delete], sender=RideRequest)
+def bump_ride_versions(sender, instance, **kwargs):
+    etags.bump(etags.RIDES)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def bump_booking_versions(sender, instance, **kwargs):
+    etags.bump(etags.RIDES, etags.driver_scope(instance.driver_id))
+
+
+@receiver([post_save, post_delete], sender=DriverReview)
+def bump_review_versions(sender, instance, **kwargs):
+    etags.bump(etags.driver_scope(instance.driver_id), etags.reviews_scope(instance.driver_id))
+
+
+@receiver([post_save, post_delete], sender=RideOffer)
+def bump_offer_versions(sender, instance, **kwargs):
+    etags.bump(etags.driver_scope(instance.driver_id))
+
+
+@receiver(post_save, sender=DriverProfile)
+def bump_profile_version(sender, instance, **kwargs):
+    etags.bump(etags.driver_scope(instance.user_id))
@@ -0,0 +1,70 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Greatest
+
+from .models import Account, Booking, DriverReview, DriverStats
+
+# Booking status -> DriverStats counter it is counted in
+STATUS_COUNTERS = {
+    "ongoing": "ongoing_count",
+    "completed": "completed_count",
+}
+
+
+def bump(driver_id, **deltas):
+    """Add deltas to a driver's counters with a single UPDATE, creating the row if needed.
+
+    Counters never go below zero. A row is only created for an increment:
+    decrements for a missing row (e.g. while the driver's account is being
+    deleted and the cascade already removed it) are dropped.
+    """
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+    if DriverStats.objects.filter(driver_id=driver_id).update(**updates):
+        return
+    if any(delta > 0 for delta in deltas.values()) and Account.objects.filter(pk=driver_id).exists():
+        DriverStats.objects.get_or_create(driver_id=driver_id)
+        DriverStats.objects.filter(driver_id=driver_id).update(**updates)
+
+
+def status_deltas(old_status, new_status):
+    """Counter deltas for a booking moving from old_status to new_status."""
+    deltas = {}
+    if old_status in STATUS_COUNTERS:
+        deltas[STATUS_COUNTERS[old_status]] = -1
+    if new_status in STATUS_COUNTERS:
+        field = STATUS_COUNTERS[new_status]
+        deltas[field] = deltas.get(field, 0) + 1
+    return deltas
+
+
+def rebuild_driver_stats():
+    """Recount every driver's stats from bookings and reviews; returns the row count."""
+    drivers = set(Account.objects.filter(role="driver").values_list("id", flat=True))
+    bookings = {
+        row["driver_id"]: row
+        for row in Booking.objects.values("driver_id").annotate(
+            completed=Count("id", filter=Q(status="completed")),
+            ongoing=Count("id", filter=Q(status="ongoing")),
+        )
+    }
+    reviews = {
+        row["driver_id"]: row
+        for row in DriverReview.objects.values("driver_id").annotate(total=Sum("rating"), n=Count("id"))
+    }
+    rows = [
+        DriverStats(
+            driver_id=driver_id,
+            completed_count=bookings.get(driver_id, {}).get("completed", 0),
+            ongoing_count=bookings.get(driver_id, {}).get("ongoing", 0),
+            rating_sum=reviews.get(driver_id, {}).get("total", 0),
+            rating_count=reviews.get(driver_id, {}).get("n", 0),
+        )
+        for driver_id in drivers | set(bookings) | set(reviews)
+    ]
+    with transaction.atomic():
+        DriverStats.objects.all().delete()
+        DriverStats.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
@@ -1,3 +1,401 @@
-from django.test import TestCase
+import importlib
+import io
+import random
+import tempfile
+import threading
+from collections import Counter
+from datetime import timedelta
 
-# Create your tests here.
+from django.apps import apps
+
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.db.models import Count
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .bookings import accept_ride
+from .geo import online_drivers
+from .geocoding import geocode_rows
+from .images import process_image
+from .leaderboard import CONTEXT_KEY, invalidate_leaderboard
+from .locations import LiveLocationStore, live_locations
+from .management.commands.check_query_budget import BUDGETS, seed_world
+from .models import Account, Booking, DriverProfile, DriverReview, DriverStats, GeocodeCache, RideRequest
+from .stats import bump
+
+
+def make_booking(customer, driver, status):
+    ride = RideRequest.objects.create(
+        customer=customer, pickup_location="A", dropoff_location="B",
+        status="accepted" if status == "ongoing" else status,
+    )
+    return Booking.objects.create(ride_request=ride, driver=driver, status=status)
+
+
+class DriverStatsTests(TestCase):
+    def setUp(self):
+        self.customer = Account.objects.create(username="customer", role="customer")
+        self.driver = Account.objects.create(username="driver", role="driver")
+
+    def test_deleting_driver_with_bookings_and_reviews(self):
+        make_booking(self.customer, self.driver, "ongoing")
+        completed = make_booking(self.customer, self.driver, "completed")
+        DriverReview.objects.create(booking=completed, driver=self.driver, customer=self.customer, rating=5)
+
+        self.driver.delete()
+
+        self.assertFalse(DriverStats.objects.filter(driver_id=self.driver.pk).exists())
+        self.assertFalse(Booking.objects.exists())
+
+    def test_editing_a_rating_moves_the_sum(self):
+        review = DriverReview.objects.create(
+            booking=make_booking(self.customer, self.driver, "completed"), driver=self.driver, customer=self.customer, rating=5,
+        )
+        review.rating = 2
+        review.save()
+        DriverReview.objects.get(pk=review.pk).save()  # unchanged: no bump
+        stats = DriverStats.objects.get(driver=self.driver)
+        self.assertEqual((stats.rating_sum, stats.rating_count), (2, 1))
+
+        review.delete()
+        stats.refresh_from_db()
+        self.assertEqual((stats.rating_sum, stats.rating_count), (0, 0))
+
+    def test_counters_do_not_go_below_zero(self):
+        bump(self.driver.pk, ongoing_count=-1, rating_sum=-5, rating_count=-1)
+        stats = DriverStats.objects.get(driver=self.driver)
+        self.assertEqual((stats.ongoing_count, stats.rating_sum, stats.rating_count), (0, 0, 0))
+
+    def test_decrement_does_not_create_missing_row(self):
+        DriverStats.objects.filter(driver=self.driver).delete()
+        bump(self.driver.pk, ongoing_count=-1)
+        self.assertFalse(DriverStats.objects.filter(driver=self.driver).exists())
+
+
+@override_settings(LIVE_LOCATIONS={"ENABLED": True, "BACKEND": "local", "REWARM_INTERVAL": 30})
+class LiveLocationStoreTests(TestCase):
+    def setUp(self):
+        self.store = LiveLocationStore()
+        self.drivers = [Account.objects.create(username=f"driver-{i}", role="driver") for i in range(3)]
+
+    def test_nearest_reads_only_covered_cells(self):
+        near, far, _ = self.drivers
+        self.store.update(near.pk, 23.81, 90.41)
+        self.store.update(far.pk, 40.0, 10.0)
+        self.assertEqual(self.store.backend.in_cells(["238:904"]), {near.pk: self.store.backend.all()[near.pk]})
+        self.assertEqual([d[0] for d in self.store.nearest(23.80, 90.40, radius_km=10)], [near.pk])
+        self.assertEqual(len(self.store.nearest(23.80, 90.40)), 2)
+
+    def test_warm_takes_availability_from_database(self):
+        online, busy, offline = self.drivers
+        now = timezone.now()
+        for user, availability in zip(self.drivers, ("online", "busy", "offline")):
+            DriverProfile.objects.create(
+                user=user, current_lat=23.81, current_lng=90.41, location_updated_at=now,
+            )
+            DriverProfile.objects.filter(user=user).update(availability=availability)
+        # A position this process still has for a driver who went offline elsewhere
+        self.store.update(offline.pk, 23.81, 90.41)
+        self.store.warm()
+        self.assertEqual(set(self.store.positions()), {online.pk})
+
+
+@override_settings(LIVE_LOCATIONS={"ENABLED": True, "BACKEND": "cache", "REWARM_INTERVAL": 30})
+class LiveLocationCacheBackendTests(LiveLocationStoreTests):
+    def setUp(self):
+        caches["live_locations"].clear()
+        super().setUp()
+
+    def test_moved_driver_leaves_old_cell(self):
+        driver = self.drivers[0]
+        self.store.update(driver.pk, 23.81, 90.41)
+        self.store.update(driver.pk, 40.0, 10.0)
+        self.assertEqual(self.store.nearest(23.80, 90.40, radius_km=10), [])
+
+
+class AcceptRideRaceTests(TransactionTestCase):
+    """Drivers racing on the same rides from separate threads (and connections)."""
+
+    n_rides = 30
+    n_drivers = 8
+
+    def test_each_ride_is_accepted_exactly_once(self):
+        customer = Account.objects.create(username="customer", role="customer")
+        drivers = [Account.objects.create(username=f"driver-{i}", role="driver") for i in range(self.n_drivers)]
+        ride_ids = [
+            RideRequest.objects.create(customer=customer, pickup_location="A", dropoff_location="B").pk
+            for _ in range(self.n_rides)
+        ]
+        outcomes = Counter()
+        lock = threading.Lock()
+        barrier = threading.Barrier(self.n_drivers)
+
+        def race(driver):
+            order = ride_ids[:]
+            random.Random(driver.pk).shuffle(order)
+            barrier.wait()
+            try:
+                for ride_id in order:
+                    try:
+                        outcome = "accepted" if accept_ride(ride_id, driver) else "taken"
+                    except Exception as e:
+                        outcome = f"{type(e).__name__}: {e}"
+                    with lock:
+                        outcomes[outcome] += 1
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=race, args=(d,)) for d in drivers]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(outcomes, Counter(accepted=self.n_rides, taken=self.n_rides * (self.n_drivers - 1)))
+        self.assertEqual(Booking.objects.count(), self.n_rides)
+        self.assertFalse(Booking.objects.values("ride_request").annotate(n=Count("id")).filter(n__gt=1).exists())
+        self.assertFalse(RideRequest.objects.filter(status="pending").exists())
+
+
+class QueryBudgetTests(TestCase):
+    """Each view stays within its BUDGETS entry and does not grow with the number of rows."""
+
+    sizes = (3, 40)
+
+    def setUp(self):
+        cache.clear()
+        self.worlds = [seed_world(f"s{n}", n) for n in self.sizes]
+
+    def count_queries(self, user, url):
+        client = Client()
+        client.force_login(user)
+        client.get(url)  # warm per-process caches (live locations, leaderboard)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_views_within_budget(self):
+        for name, budget in BUDGETS.items():
+            with self.subTest(view=name):
+                counts = [self.count_queries(*world[name]) for world in self.worlds]
+                self.assertLessEqual(max(counts), budget)
+                self.assertEqual(len(set(counts)), 1, f"query count grows with rows: {counts}")
+
+
+@override_settings(LIVE_LOCATIONS={"ENABLED": True, "BACKEND": "local", "REWARM_INTERVAL": 30})
+class DriverAvailabilityTests(TestCase):
+    def setUp(self):
+        self.driver = Account.objects.create(username="driver", role="driver")
+        self.profile = DriverProfile.objects.create(
+            user=self.driver, nid_number="1", license_number="1", current_lat=23.81, current_lng=90.41,
+        )
+        self.client.force_login(self.driver)
+
+    def test_backfill_gives_located_drivers_a_timestamp(self):
+        DriverProfile.objects.filter(pk=self.profile.pk).update(availability="online")
+        migration = importlib.import_module("core.migrations.0011_backfill_location_updated_at")
+        migration.backfill_location_updated_at(apps, None)
+        self.assertEqual(list(online_drivers()), [self.profile])
+
+    def test_geocoded_profile_reports_a_position(self):
+        self.profile.current_lat = self.profile.current_lng = None
+        self.profile.address = "Gulshan 1, Dhaka"
+        self.profile.save()
+        GeocodeCache.objects.create(
+            address_key="gulshan 1, dhaka", lat=23.78, lng=90.41, expires_at=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(geocode_rows([self.profile]), 1)
+        self.assertEqual(list(online_drivers()), [self.profile])
+
+    def test_toggle_online_and_offline(self):
+        self.profile.move_to(23.81, 90.41)
+        self.profile.save()
+        live_locations._backend = None  # fresh local backend under this test's settings
+        live_locations.update(self.driver.pk, 23.81, 90.41)
+
+        self.client.post(reverse("set_availability"), {"availability": "offline"})
+        self.assertFalse(online_drivers().exists())
+        self.assertNotIn(self.driver.pk, live_locations.backend.all())
+
+        self.client.post(reverse("set_availability"), {"availability": "online"})
+        self.assertEqual(list(online_drivers()), [self.profile])
+
+    def test_profile_edit_is_not_a_position_report(self):
+        stamp = timezone.now() - timedelta(hours=3)
+        DriverProfile.objects.filter(pk=self.profile.pk).update(location_updated_at=stamp)
+        # The form comes back with the stored coordinates pre-filled
+        form = {"license": "1", "vehicle": "Van", "lat": str(self.profile.current_lat), "lng": str(self.profile.current_lng)}
+        self.client.post(reverse("driver_profile"), form)
+        stored = DriverProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual((stored.vehicle_details, stored.location_updated_at, stored.availability), ("Van", stamp, "offline"))
+
+        self.client.post(reverse("driver_profile"), {**form, "located": "1"})
+        stored = DriverProfile.objects.get(pk=self.profile.pk)
+        self.assertGreater(stored.location_updated_at, stamp)
+        self.assertEqual(stored.availability, "offline")
+
+    def test_geocoding_keeps_a_busy_set_during_the_lookup(self):
+        self.profile.current_lat = self.profile.current_lng = None
+        self.profile.address = "Gulshan 1, Dhaka"
+        self.profile.save()
+        GeocodeCache.objects.create(
+            address_key="gulshan 1, dhaka", lat=23.78, lng=90.41, expires_at=timezone.now() + timedelta(days=1),
+        )
+        row = DriverProfile.objects.get(pk=self.profile.pk)
+        DriverProfile.objects.filter(pk=self.profile.pk).update(availability="busy")
+        geocode_rows([row])
+        self.assertEqual(DriverProfile.objects.get(pk=self.profile.pk).availability, "busy")
+
+    def test_busy_driver_cannot_go_offline(self):
+        make_booking(Account.objects.create(username="customer", role="customer"), self.driver, "ongoing")
+        self.client.post(reverse("set_availability"), {"availability": "offline"})
+        self.assertEqual(DriverProfile.objects.get(pk=self.profile.pk).availability, "busy")
+
+
+class DashboardPanelTests(TestCase):
+    """suggest_drivers and nearby_rides show their panel on top of the full dashboard."""
+
+    def setUp(self):
+        self.customer = Account.objects.create(username="customer", role="customer")
+        self.driver = Account.objects.create(username="driver", role="driver")
+        DriverProfile.objects.create(
+            user=self.driver, nid_number="1", license_number="1", current_lat=23.81, current_lng=90.41,
+        )
+        self.booking = make_booking(self.customer, self.driver, "ongoing")
+
+    def test_suggest_drivers_keeps_customer_dashboard(self):
+        ride = RideRequest.objects.create(
+            customer=self.customer, pickup_location="Gulshan", dropoff_location="Banani", pickup_lat=23.8, pickup_lng=90.4,
+        )
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse("suggest_drivers", args=[ride.pk]))
+        self.assertEqual(response.context["suggest_ride"], ride)
+        self.assertEqual(list(response.context["customer_bookings"]), [self.booking])
+        self.assertEqual(len(response.context["rides"]), 2)
+
+    def test_nearby_rides_keeps_driver_dashboard(self):
+        self.client.force_login(self.driver)
+        response = self.client.get(reverse("nearby_rides"))
+        self.assertEqual(list(response.context["bookings"]), [self.booking])
+        self.assertEqual(response.context["total_ongoing"], 1)
+
+
+class ChatAccessTests(TestCase):
+    """The chat views and the API apply the same booking-participant check."""
+
+    def setUp(self):
+        self.customer = Account.objects.create(username="customer", role="customer")
+        self.driver = Account.objects.create(username="driver", role="driver")
+        self.booking = make_booking(self.customer, self.driver, "ongoing")
+
+    def get_both(self, user, booking_id):
+        self.client.force_login(user)
+        return [
+            self.client.get(reverse(name, args=[booking_id])).status_code
+            for name in ("chat_history", "api_chat_messages")
+        ]
+
+    def test_participants_outsiders_and_missing_bookings(self):
+        outsider = Account.objects.create(username="outsider", role="customer")
+        self.assertEqual(self.get_both(self.driver, self.booking.pk), [200, 200])
+        self.assertEqual(self.get_both(outsider, self.booking.pk), [403, 403])
+        self.assertEqual(self.get_both(self.customer, self.booking.pk + 1), [404, 404])
+        Booking.objects.filter(pk=self.booking.pk).update(status="completed")
+        self.assertEqual(self.get_both(self.customer, self.booking.pk), [410, 410])
+
+
+def make_upload(name="photo.jpg", color="red"):
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 48), color).save(buf, "JPEG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/jpeg")
+
+
+@override_settings(IMAGES={"ASYNC": False})
+class ImageReplacementTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.driver = Account.objects.create(username="driver", role="driver")
+        self.profile = DriverProfile.objects.create(
+            user=self.driver, nid_number="1", license_number="1", profile_picture=make_upload(),
+        )
+        self.storage = self.profile.profile_picture.storage
+
+    def test_processing_replaces_the_original(self):
+        old_name = self.profile.profile_picture.name
+        self.assertTrue(process_image(self.profile))
+        stored = DriverProfile.objects.get(pk=self.profile.pk)
+        self.assertTrue(stored.profile_picture.name.endswith(".webp"))
+        self.assertTrue(self.storage.exists(stored.profile_thumbnail.name))
+        self.assertFalse(self.storage.exists(old_name))
+
+    def test_processing_a_replaced_image_keeps_the_newer_upload(self):
+        stale = DriverProfile.objects.get(pk=self.profile.pk)
+        newer = DriverProfile.objects.get(pk=self.profile.pk)
+        newer.profile_picture = make_upload("newer.jpg", "blue")
+        newer.save()
+
+        self.assertFalse(process_image(stale))
+        stored = DriverProfile.objects.get(pk=self.profile.pk)
+        self.assertEqual(stored.profile_picture.name, newer.profile_picture.name)
+        self.assertFalse(stored.profile_thumbnail)
+        # The WebP files made for the stale image are gone again
+        made = [name for folder in ("profiles", "profiles/thumbs") for name in self.storage.listdir(folder)[1]]
+        self.assertFalse([name for name in made if name.endswith(".webp")])
+
+    def test_upload_deletes_old_files_only_after_commit(self):
+        old_name = self.profile.profile_picture.name
+        self.client.force_login(self.driver)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("driver_profile"), {
+                "license": "1", "vehicle": "Car", "profile_picture": make_upload("new.jpg", "green"),
+            })
+            self.assertTrue(self.storage.exists(old_name))
+        self.assertFalse(self.storage.exists(old_name))
+        stored = DriverProfile.objects.get(pk=self.profile.pk)
+        self.assertTrue(self.storage.exists(stored.profile_picture.name))
+        self.assertTrue(stored.profile_thumbnail)
+
+
+class ConditionalGetTests(TestCase):
+    def test_first_visit_etag_survives_csrf_cookie(self):
+        driver = Account.objects.create(username="driver", role="driver")
+        DriverProfile.objects.create(user=driver, nid_number="1", license_number="1")
+        self.client.force_login(driver)
+        etag = self.client.get(reverse("driver_dashboard"))["ETag"]
+        response = self.client.get(reverse("driver_dashboard"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class LeaderboardPageTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        caches["template_fragments"].clear()
+        self.driver = Account.objects.create(username="first-name", role="driver")
+
+    def test_rendered_body_is_cached_per_version(self):
+        self.assertContains(self.client.get(reverse("leaderboard")), "first-name")
+        # Same version: the cached body is served even if the data were rebuilt
+        Account.objects.filter(pk=self.driver.pk).update(username="second-name")
+        cache.delete(CONTEXT_KEY)
+        self.assertContains(self.client.get(reverse("leaderboard")), "first-name")
+
+        invalidate_leaderboard()
+        self.assertContains(self.client.get(reverse("leaderboard")), "second-name")
+
+
+class NearbyDriversApiTests(TestCase):
+    def test_rejects_non_finite_and_out_of_range_coordinates(self):
+        self.client.force_login(Account.objects.create(username="customer", role="customer"))
+        url = reverse("api_nearby_drivers")
+        for lat, lng in (("nan", "90"), ("23.8", "inf"), ("1000", "90"), ("23.8", "-181")):
+            with self.subTest(lat=lat, lng=lng), self.assertNumQueries(2):  # session and user only
+                self.assertEqual(self.client.get(url, {"lat": lat, "lng": lng}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"lat": "23.8", "lng": "90.4"}).status_code, 200)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
   # ---------- AUTH (session-based) ----------
@@ -10,6 +10,7 @@ urlpatterns = [
   # ---------- DRIVER PROFILE ----------
   path("driver/profile/", views.driver_profile_view, name="driver_profile"),
   path("driver/profile/delete-picture/", views.delete_profile_picture, name="delete_profile_picture"),
+  path("driver/availability/", views.set_availability, name="set_availability"),
 
   # ---------- RIDE REQUEST ----------
   path("customer/dashboard/", views.customer_dashboard, name="customer_dashboard"),
@@ -22,6 +23,9 @@ urlpatterns = [
   path("bookings/", views.list_my_bookings, name="list_my_bookings"),
   path("booking/<int:booking_id>/status/", views.update_booking_status, name="update_booking_status"),
   path("chat/<int:booking_id>/", views.chat_room, name="chat_room"),
+  path("chat/<int:booking_id>/messages/", views.chat_history, name="chat_history"),
+  path("chat/<int:booking_id>/poll/", views.chat_poll, name="chat_poll"),
+  path("chat/<int:booking_id>/send/", views.chat_send, name="chat_send"),
 
     # ---------- NEARBY FEATURES ----------
   path("drivers/nearby/", views.nearby_drivers, name="nearby_drivers"),  # 🌍 customer → see nearby drivers
@@ -44,6 +48,14 @@ urlpatterns = [
 
   # ---------- USER LOCATION ----------
   path("user/update-location/", views.update_location, name="update_location"),
+  path("api/locations/", views.ingest_locations, name="ingest_locations"),
+
+  # ---------- JSON API v1 (read-only) ----------
+  path("api/v1/drivers/nearby/", api.nearby_drivers, name="api_nearby_drivers"),
+  path("api/v1/rides/available/", api.available_rides, name="api_available_rides"),
+  path("api/v1/bookings/", api.bookings, name="api_bookings"),
+  path("api/v1/chat/<int:booking_id>/messages/", api.chat_messages, name="api_chat_messages"),
+  path("api/v1/leaderboard/", api.leaderboard, name="api_leaderboard"),
 ]
 urlpatterns += [
   path("", views.home_view, name="home"),
@@ -1,11 +1,100 @@
+import heapq
 import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; fall back to the array module
+    np = None
+
+EARTH_RADIUS_KM = 6371
+
 
 def calculate_distance(lat1, lon1, lat2, lon2):
-    R = 6371  # Earth radius in km
+    """Return distance in kilometers between two lat/lng points."""
+    if None in (lat1, lon1, lat2, lon2):
+        return None
     dlat = math.radians(lat2 - lat1)
     dlon = math.radians(lon2 - lon1)
     a = (math.sin(dlat/2) ** 2 +
          math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *
          math.sin(dlon/2) ** 2)
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    return R * c
\ No newline at end of file
+    return EARTH_RADIUS_KM * c
+
+
+def batch_distances(lat, lng, lats, lngs):
+    """Return distances in km from one point to many points.
+
+    The result is a numpy array when numpy is installed, otherwise an
+    ``array('d')``; both index and iterate like a list of floats.
+    """
+    if np is not None:
+        lat1 = math.radians(lat)
+        lat2 = np.radians(np.asarray(lats, dtype=float))
+        dlat = lat2 - lat1
+        dlon = np.radians(np.asarray(lngs, dtype=float) - lng)
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    lat1 = math.radians(lat)
+    cos_lat1 = math.cos(lat1)
+    sin, cos, radians = math.sin, math.cos, math.radians
+    out = array("d")
+    for lat2, lng2 in zip(lats, lngs):
+        lat2 = radians(lat2)
+        a = sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos(lat2) * sin(radians(lng2 - lng) / 2) ** 2
+        out.append(2 * EARTH_RADIUS_KM * math.atan2(math.sqrt(a), math.sqrt(1 - a)))
+    return out
+
+
+def top_k(distances, k=None, max_km=None):
+    """Return indices of the k smallest distances (optionally <= max_km), closest first."""
+    if np is not None and isinstance(distances, np.ndarray):
+        idx = np.flatnonzero(distances <= max_km) if max_km is not None else np.arange(len(distances))
+        if k is not None and len(idx) > k:
+            idx = idx[np.argpartition(distances[idx], k - 1)[:k]]
+        return idx[np.argsort(distances[idx], kind="stable")].tolist()
+
+    idx = range(len(distances))
+    if max_km is not None:
+        idx = [i for i in idx if distances[i] <= max_km]
+    if k is None:
+        return sorted(idx, key=distances.__getitem__)
+    return heapq.nsmallest(k, idx, key=distances.__getitem__)
+
+# Grid cells used to bucket coordinates for indexed lookups.
+# 0.1 degree is roughly 11 km of latitude, so a 10 km search touches ~9 cells.
+CELL_SIZE_DEG = 0.1
+KM_PER_DEG_LAT = 111.32
+MAX_CELLS = 400
+
+
+def cell_for(lat, lng):
+    """Return the grid cell key for a lat/lng point, or None if unknown."""
+    if lat is None or lng is None:
+        return None
+    return f"{math.floor(lat / CELL_SIZE_DEG)}:{math.floor(lng / CELL_SIZE_DEG)}"
+
+
+def bounding_box(lat, lng, radius_km):
+    """Return (min_lat, max_lat, min_lng, max_lng) enclosing a radius around a point."""
+    dlat = radius_km / KM_PER_DEG_LAT
+    min_lat = max(-90.0, lat - dlat)
+    max_lat = min(90.0, lat + dlat)
+    # Longitude degrees shrink towards the poles; size the box for the widest row.
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat < 1e-6:
+        return min_lat, max_lat, -180.0, 180.0
+    dlng = min(180.0, radius_km / (KM_PER_DEG_LAT * cos_lat))
+    return min_lat, max_lat, max(-180.0, lng - dlng), min(180.0, lng + dlng)
+
+
+def cells_in_box(box):
+    """Return the cell keys covering a bounding box, or None if there are too many."""
+    min_lat, max_lat, min_lng, max_lng = box
+    rows = range(math.floor(min_lat / CELL_SIZE_DEG), math.floor(max_lat / CELL_SIZE_DEG) + 1)
+    cols = range(math.floor(min_lng / CELL_SIZE_DEG), math.floor(max_lng / CELL_SIZE_DEG) + 1)
+    if len(rows) * len(cols) > MAX_CELLS:
+        return None
+    return [f"{r}:{c}" for r in rows for c in cols]
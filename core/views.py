@@ -2,13 +2,11 @@ from django.contrib import messages
 from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseRedirect, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
-from django.db.models import Count, Avg, Q
-from math import radians, sin, cos, sqrt, atan2
-from urllib.parse import urlencode
-from urllib.request import urlopen, Request
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 import json
 
 from .models import (
@@ -20,44 +18,22 @@ from .models import (
     EmergencyAlert,
     DriverReview,
     ChatMessage,
+    DriverStats,
+    RideOffer,
 )
 from .models import Account
-
-
-def calculate_distance(lat1, lon1, lat2, lon2):
-    """Return distance in kilometers between two lat/lng points."""
-    if None in [lat1, lon1, lat2, lon2]:
-        return None
-    R = 6371  # Earth radius in km
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
-
-
-def geocode_address(address: str):
-    try:
-        if not address:
-            return None, None
-        params = {
-            "q": address,
-            "format": "json",
-            "limit": 1,
-        }
-        url = "https://nominatim.openstreetmap.org/search?" + urlencode(params)
-        req = Request(url, headers={
-            "User-Agent": "RentADriver/1.0 (education; contact: example@example.com)",
-        })
-        with urlopen(req, timeout=5) as resp:
-            data = json.loads(resp.read().decode("utf-8"))
-            if isinstance(data, list) and data:
-                lat = float(data[0].get("lat"))
-                lon = float(data[0].get("lon"))
-                return lat, lon
-    except Exception:
-        pass
-    return None, None
+from .bookings import accept_ride
+from .etags import available_rides_etag, bump as bump_etags, driver_dashboard_etag, driver_reviews_etag, driver_scope
+from .chat import access_error as chat_access_error, ahistory, get_setting as chat_setting, history, hub as chat_hub, serialize_message
+from .leaderboard import leaderboard_page_context
+from .geocoding import lookup_cached, schedule_geocode
+from .images import delete_files_on_commit, image_files, schedule_processing, upload_error
+from .locations import (
+    bring_online, buffer as location_buffer, get_setting as location_setting, live_locations, parse_pings,
+)
+from .geo import k_nearest_drivers, located_drivers, nearest_drivers
+from .lookups import nearby_rides as cached_nearby_rides, suggested_drivers
+from .pagination import paginate_request
 
 
 def home_view(request):
@@ -116,6 +92,10 @@ def driver_profile_view(request):
         nid_number = request.POST.get("nid_number")
         address = request.POST.get("address")
         profile_picture = request.FILES.get("profile_picture")
+        picture_error = upload_error(request, "profile_picture")
+        if picture_error:
+            messages.error(request, picture_error)
+            profile_picture = None
         lat = request.POST.get("lat")
         lng = request.POST.get("lng")
         profile, _ = DriverProfile.objects.get_or_create(user=request.user)
@@ -127,26 +107,54 @@ def driver_profile_view(request):
             profile.nid_number = nid_number
         if address is not None:
             profile.address = address
+        old_files = []
         if profile_picture:
+            # Notun chobi rakha hocche; purano file gula save er pore muche, thumbnail pore background e toiri hobe
+            old_files = image_files(profile)
             profile.profile_picture = profile_picture
+            profile.profile_thumbnail = None
        # Jodi latitude ar longitude deya thake tahole oigulo use hobe.Ar jodi na thake, tahole deya address theke location ber kora hobe.
         lat_val = float(lat) if lat else None
         lng_val = float(lng) if lng else None
+        needs_geocode = False
 
         if lat_val is None or lng_val is None:
             # Jodi address deya thake tahole sei address diye coordinates ber korar try kore"
+            # Cache e na thakle background e geocode hobe, request ta wait korbe na
             if address:
-                g_lat, g_lng = geocode_address(address)
-                if lat_val is None:
-                    lat_val = g_lat
-                if lng_val is None:
-                    lng_val = g_lng
-                if g_lat is None or g_lng is None:
-                    messages.info(request, "Could not determine coordinates from address; you can use 'Use my location' or enter coordinates manually.")
-
-        profile.current_lat = lat_val
-        profile.current_lng = lng_val
+                cached = lookup_cached(address)
+                if cached is None:
+                    needs_geocode = True
+                else:
+                    g_lat, g_lng = cached
+                    if lat_val is None:
+                        lat_val = g_lat
+                    if lng_val is None:
+                        lng_val = g_lng
+                    if g_lat is None or g_lng is None:
+                        messages.info(request, "Could not determine coordinates from address; you can use 'Use my location' or enter coordinates manually.")
+
+        # Form e purono coordinates age thekei bhora thake, tai shudhu notun position
+        # ba "Use my location" button thekei position report dhora hoy. Availability
+        # profile edit e kokhono bodlay na (set_availability dekho).
+        reported = lat_val is not None and lng_val is not None and (
+            request.POST.get("located") == "1"
+            or (lat_val, lng_val) != (profile.current_lat, profile.current_lng)
+        )
+        if reported:
+            profile.move_to(lat_val, lng_val)
+        else:
+            profile.current_lat = lat_val
+            profile.current_lng = lng_val
         profile.save()
+        if profile_picture:
+            delete_files_on_commit(old_files)
+            schedule_processing(profile)
+        if reported and profile.availability == "online":
+            live_locations.update(request.user.pk, lat_val, lng_val)
+        if needs_geocode:
+            schedule_geocode(profile)
+            messages.info(request, "Looking up coordinates for your address; your location will update shortly.")
         messages.success(request, "Profile saved.")
         return redirect("driver_dashboard")
     try:
@@ -165,9 +173,11 @@ def delete_profile_picture(request):
     try:
         profile = DriverProfile.objects.get(user=request.user)
         if profile.profile_picture:
-            profile.profile_picture.delete(save=False)
+            old_files = image_files(profile)
             profile.profile_picture = None
-            profile.save(update_fields=["profile_picture"])
+            profile.profile_thumbnail = None
+            profile.save(update_fields=["profile_picture", "profile_thumbnail"])
+            delete_files_on_commit(old_files)
             messages.info(request, "Profile picture removed.")
         else:
             messages.info(request, "No profile picture to remove.")
@@ -178,6 +188,47 @@ def delete_profile_picture(request):
 
 # RIDE REQUEST
 
+def _customer_dashboard_context(request):
+    """Everything customer_dashboard.html shows; views adding a panel to it start from this."""
+    # Template e r.booking, b.ride_request, b.review lage; ek query te join kore ana hocche
+    # Duto list er alada cursor, tai ekta list er porer page e gele onnota jekhane chilo sekhanei thake
+    rides = paginate_request(
+        request,
+        RideRequest.objects.filter(customer=request.user).select_related("booking"),
+        "created_at", param="rides_after",
+    )
+    customer_bookings = paginate_request(
+        request,
+        Booking.objects.filter(ride_request__customer=request.user).select_related("ride_request", "review"),
+        "confirmed_at", param="bookings_after",
+    )
+
+    # Build nearby drivers list based on customer's last known location
+    lat0 = request.user.last_lat
+    lng0 = request.user.last_lng
+    if lat0 is not None and lng0 is not None:
+        # Jodi 10 km er vitore keu na thake tahole sobcheye kacher driver gula dekhano hoy
+        found = nearest_drivers(lat0, lng0, radius_km=10, limit=10) or k_nearest_drivers(lat0, lng0, k=10, radius_km=40)
+        nearby_list = [{
+            "user": d.user,
+            "vehicle_details": d.vehicle_details,
+            "distance_km": round(dist, 2),
+        } for d, dist in found]
+    else:
+        # kono location nai
+        nearby_list = [{
+            "user": d.user,
+            "vehicle_details": d.vehicle_details,
+            "distance_km": None,
+        } for d in located_drivers()[:10]]
+
+    return {
+        "rides": rides,
+        "nearby_drivers": nearby_list,
+        "customer_bookings": customer_bookings,
+    }
+
+
 @login_required
 def customer_dashboard(request):
     if request.user.role != "customer":
@@ -186,49 +237,20 @@ def customer_dashboard(request):
         pickup = request.POST.get("pickup")
         dropoff = request.POST.get("dropoff")
         car = request.POST.get("carName")
-        RideRequest.objects.create(
+        cached = lookup_cached(pickup)
+        pickup_lat, pickup_lng = cached or (None, None)
+        ride = RideRequest.objects.create(
             customer=request.user,
             pickup_location=pickup,
             dropoff_location=dropoff,
+            pickup_lat=pickup_lat,
+            pickup_lng=pickup_lng,
         )
+        if cached is None:
+            schedule_geocode(ride)
         messages.success(request, "Ride request created.")
         return redirect("customer_dashboard")
-    rides = RideRequest.objects.filter(customer=request.user).order_by("-created_at")
-    customer_bookings = Booking.objects.filter(ride_request__customer=request.user).order_by("-confirmed_at")
-
-    # Build nearby drivers list based on customer's last known location
-    nearby_list = []
-    lat0 = request.user.last_lat
-    lng0 = request.user.last_lng
-    drivers = DriverProfile.objects.select_related("user").all()
-    for d in drivers:
-        if d.current_lat is None or d.current_lng is None:
-            continue
-        dist = None
-        if lat0 is not None and lng0 is not None:
-            dist = calculate_distance(lat0, lng0, d.current_lat, d.current_lng)
-        nearby_list.append({
-            "user": d.user,
-            "vehicle_details": d.vehicle_details,
-            "distance_km": round(dist, 2) if dist is not None else None,
-        })
-
-    # Jodi distance thake tahole distance er upor vitti kore sort kore ar  10 km er vitore ja ase oigula filter kore"
-    if any(item["distance_km"] is not None for item in nearby_list):
-        filtered = [item for item in nearby_list if item["distance_km"] is not None and item["distance_km"] <= 10]
-        if not filtered:
-            filtered = [item for item in nearby_list if item["distance_km"] is not None]
-        filtered.sort(key=lambda x: x["distance_km"])
-        nearby_list = filtered[:10]
-    else:
-        # kono location nai
-        nearby_list = nearby_list[:10]
-
-    return render(request, "customer_dashboard.html", {
-        "rides": rides,
-        "nearby_drivers": nearby_list,
-        "customer_bookings": customer_bookings,
-    })
+    return render(request, "customer_dashboard.html", _customer_dashboard_context(request))
 
 
 # BOOKING 
@@ -237,10 +259,11 @@ def customer_dashboard(request):
 def create_booking(request, ride_request_id):
     if request.user.role != "driver":
         return HttpResponseForbidden("Only drivers can accept bookings")
-    ride = get_object_or_404(RideRequest, id=ride_request_id, status="pending")
-    ride.status = "accepted"
-    ride.save()
-    Booking.objects.create(ride_request=ride, driver=request.user)
+    booking = accept_ride(ride_request_id, request.user)
+    if booking is None:
+        get_object_or_404(RideRequest, id=ride_request_id)
+        messages.info(request, "This ride has already been taken.")
+        return redirect("driver_dashboard")
     messages.success(request, "Booking created.")
     return redirect("driver_dashboard")
 
@@ -251,7 +274,7 @@ def list_my_bookings(request):
         bookings = Booking.objects.filter(driver=request.user)
     else:
         bookings = Booking.objects.filter(ride_request__customer=request.user)
-    return render(request, "driver_dashboard.html", {"bookings": bookings})
+    return render(request, "driver_dashboard.html", {"bookings": bookings.select_related("ride_request")})
 
 
 @login_required
@@ -316,9 +339,16 @@ def edit_ride_request(request, ride_request_id):
         if not pickup or not dropoff:
             messages.error(request, "Both pickup and dropoff are required.")
             return redirect("edit_ride_request", ride_request_id=ride.id)
+        cached = None
+        if pickup != ride.pickup_location:
+            # Pickup changed, so the old coordinates no longer apply
+            cached = lookup_cached(pickup)
+            ride.pickup_lat, ride.pickup_lng = cached or (None, None)
         ride.pickup_location = pickup
         ride.dropoff_location = dropoff
-        ride.save(update_fields=["pickup_location", "dropoff_location"])
+        ride.save(update_fields=["pickup_location", "dropoff_location", "pickup_lat", "pickup_lng"])
+        if ride.pickup_lat is None and cached is None:
+            schedule_geocode(ride)
         messages.success(request, "Ride updated.")
         return redirect("customer_dashboard")
     return render(request, "ride_edit.html", {"ride": ride})
@@ -335,7 +365,11 @@ def create_review(request, booking_id):
         rating = int(request.POST.get("rating", 0))
         feedback = (request.POST.get("feedback") or "").strip()
         image_file = request.FILES.get("image")
-        DriverReview.objects.create(
+        image_error = upload_error(request, "image")
+        if image_error:
+            messages.error(request, image_error)
+            return redirect("customer_dashboard")
+        review = DriverReview.objects.create(
             booking=booking,
             driver=booking.driver,
             customer=request.user,
@@ -343,6 +377,8 @@ def create_review(request, booking_id):
             feedback=feedback,
             image=image_file if image_file else None,
         )
+        if image_file:
+            schedule_processing(review)
         messages.success(request, "Review submitted.")
     return redirect("customer_dashboard")
 
@@ -353,46 +389,53 @@ def delete_review(request, review_id):
     if request.user != review.customer:
         return HttpResponseForbidden("You can only delete your own review")
     if request.method == "POST":
+        old_files = image_files(review)
         review.delete()
+        delete_files_on_commit(old_files)
         messages.info(request, "Review deleted.")
     return redirect("customer_dashboard")
 
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=driver_reviews_etag)
 def list_driver_reviews(request, driver_id):
-    reviews = DriverReview.objects.filter(driver_id=driver_id).order_by("-created_at")
-    return render(request, "driver_dashboard.html", {"driver_reviews": reviews})
+    reviews = paginate_request(request, DriverReview.objects.filter(driver_id=driver_id), "created_at", param="reviews_after")
+    return render(request, "driver_dashboard.html", {"reviews": reviews})
 
 
 # ===============================================================
 # ================ SUGGEST DRIVERS ===============================
 # ===============================================================
 
+def _wants_json(request):
+    return request.GET.get("format") == "json" or "application/json" in request.headers.get("Accept", "")
+
+
 @login_required
 def suggest_drivers(request, ride_request_id):
+    wants_json = _wants_json(request)
     try:
         ride = RideRequest.objects.get(id=ride_request_id, status="pending")
     except RideRequest.DoesNotExist:
+        if wants_json:
+            return JsonResponse({"error": "Ride not found."}, status=404)
         messages.error(request, "Ride not found.")
         return redirect("customer_dashboard")
 
     if not ride.pickup_lat or not ride.pickup_lng:
+        if wants_json:
+            return JsonResponse({"error": "Ride missing coordinates."}, status=400)
         messages.error(request, "Ride missing coordinates.")
         return redirect("customer_dashboard")
 
-    drivers = DriverProfile.objects.all()
-    driver_distances = []
-    for d in drivers:
-        if d.current_lat and d.current_lng:
-            distance = calculate_distance(ride.pickup_lat, ride.pickup_lng, d.current_lat, d.current_lng)
-            driver_distances.append({
-                "driver_id": d.user.id,
-                "username": d.user.username,
-                "vehicle": d.vehicle_details,
-                "distance_km": round(distance, 2),
-            })
-    driver_distances.sort(key=lambda x: x["distance_km"])
-    request.session["suggested_drivers"] = driver_distances[:5]
-    return redirect("customer_dashboard")
+    # Session e rakhe redirect na kore shorasori dekhano hocche
+    driver_distances = suggested_drivers(request.user, ride)
+    if wants_json:
+        return JsonResponse({"ride_id": ride.id, "drivers": driver_distances})
+    context = _customer_dashboard_context(request)
+    context.update(suggest_ride=ride, suggested_drivers=driver_distances)
+    return render(request, "customer_dashboard.html", context)
+
 
 
 # ===============================================================
@@ -404,26 +447,20 @@ def nearby_drivers(request):
     lat = request.GET.get("lat")
     lng = request.GET.get("lng")
 
-    drivers = DriverProfile.objects.select_related("user").all()
-    results = []
-
-    for d in drivers:
-        if d.current_lat and d.current_lng:
-            if lat and lng:
-                distance = calculate_distance(float(lat), float(lng), d.current_lat, d.current_lng)
-                if distance > 10:
-                    continue
-                distance_str = round(distance, 2)
-            else:
-                distance_str = "N/A"
-            results.append({
-                "username": d.user.username,
-                "vehicle": d.vehicle_details,
-                "distance_km": distance_str,
-            })
-
-    results = sorted(results, key=lambda x: x["distance_km"] if isinstance(x["distance_km"], (int, float)) else 9999)
-    context = {"nearby": results[:10]}
+    if lat and lng:
+        results = [{
+            "username": d.user.username,
+            "vehicle": d.vehicle_details,
+            "distance_km": round(distance, 2),
+        } for d, distance in nearest_drivers(float(lat), float(lng), radius_km=10, limit=10)]
+    else:
+        results = [{
+            "username": d.user.username,
+            "vehicle": d.vehicle_details,
+            "distance_km": "N/A",
+        } for d in located_drivers()[:10]]
+
+    context = {"nearby": results}
     return render(request, "customer_dashboard.html", context)
 
 
@@ -434,36 +471,30 @@ def nearby_rides(request):
     if user.role != "driver":
         return HttpResponseForbidden("Only drivers can view rides")
 
+    wants_json = _wants_json(request)
     try:
         driver = DriverProfile.objects.get(user=user)
     except DriverProfile.DoesNotExist:
+        if wants_json:
+            return JsonResponse({"error": "Driver profile not found."}, status=404)
         messages.error(request, "Driver profile not found.")
         return redirect("driver_profile")
 
     if not driver.current_lat or not driver.current_lng:
+        if wants_json:
+            return JsonResponse({"error": "Driver location not set."}, status=400)
         messages.error(request, "Driver location not set.")
         return redirect("driver_profile")
 
-    rides = RideRequest.objects.filter(status="pending")
-    nearby = []
-
-    for r in rides:
-        if not r.pickup_lat or not r.pickup_lng:
-            continue
-        distance = calculate_distance(driver.current_lat, driver.current_lng, r.pickup_lat, r.pickup_lng)
-        if distance <= 10:
-            nearby.append({
-                "id": r.id,
-                "pickup_location": r.pickup_location,
-                "dropoff_location": r.dropoff_location,
-                "distance_km": round(distance, 2),
-            })
-    nearby = sorted(nearby, key=lambda x: x["distance_km"])
-    request.session["nearby_rides"] = nearby[:10]
-    return redirect("driver_dashboard")
+    if wants_json:
+        return JsonResponse({"rides": cached_nearby_rides(user, driver.current_lat, driver.current_lng)})
+    # Dashboard eo nearby rides ase, tai puro dashboard tai dekhano hocche
+    return render(request, "driver_dashboard.html", _driver_dashboard_context(request, driver))
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=available_rides_etag)
 def list_available_rides(request):
     """Show only unbooked pending rides to drivers."""
     if request.user.role != "driver":
@@ -483,62 +514,12 @@ def list_available_rides(request):
 
 @login_required
 def driver_leaderboard(request):
-    drivers = (
-        Account.objects.filter(role="driver")
-        .annotate(
-            total_completed=Count("bookings", filter=Q(bookings__status="completed")),
-            avg_rating=Avg("driver_reviews__rating")
-        )
-        .order_by("-total_completed", "-avg_rating")[:10]
-    )
-    leaderboard = [
-        {
-            "username": d.username,
-            "total_completed": d.total_completed or 0,
-            "avg_rating": round(d.avg_rating or 0, 2),
-        }
-        for d in drivers
-    ]
-    total_drivers = Account.objects.filter(role="driver").count()
-    total_rides = Booking.objects.filter(status="completed").count()
-    avg_rating_overall = DriverReview.objects.aggregate(avg=Avg("rating"))[["avg"]] if False else DriverReview.objects.aggregate(avg=Avg("rating"))["avg"]
-    context = {
-        "leaderboard": leaderboard,
-        "total_drivers": total_drivers,
-        "total_rides": total_rides,
-        "avg_rating": round(avg_rating_overall or 0, 2) if avg_rating_overall else 0.0,
-    }
-    return render(request, "leaderboard.html", context)
+    return render(request, "leaderboard.html", leaderboard_page_context())
 
 
 def driver_leaderboard_view(request):
     # wrapper to allow GET render without requiring auth for display
-    drivers = (
-        Account.objects.filter(role="driver")
-        .annotate(
-            total_completed=Count("bookings", filter=Q(bookings__status="completed")),
-            avg_rating=Avg("driver_reviews__rating")
-        )
-        .order_by("-total_completed", "-avg_rating")[:10]
-    )
-    leaderboard = [
-        {
-            "username": d.username,
-            "total_completed": d.total_completed or 0,
-            "avg_rating": round(d.avg_rating or 0, 2),
-        }
-        for d in drivers
-    ]
-    total_drivers = Account.objects.filter(role="driver").count()
-    total_rides = Booking.objects.filter(status="completed").count()
-    avg_rating_overall = DriverReview.objects.aggregate(avg=Avg("rating"))[["avg"]] if False else DriverReview.objects.aggregate(avg=Avg("rating"))["avg"]
-    context = {
-        "leaderboard": leaderboard,
-        "total_drivers": total_drivers,
-        "total_rides": total_rides,
-        "avg_rating": round(avg_rating_overall or 0, 2) if avg_rating_overall else 0.0,
-    }
-    return render(request, "leaderboard.html", context)
+    return render(request, "leaderboard.html", leaderboard_page_context())
 
 
 # ===============================================================
@@ -547,7 +528,7 @@ def driver_leaderboard_view(request):
 
 @login_required
 def chat_room(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = get_object_or_404(Booking.objects.select_related("ride_request__customer", "driver"), id=booking_id)
     user = request.user
     # Guard: allow only booking's customer or assigned driver
     if booking.ride_request.customer != user and booking.driver != user:
@@ -565,15 +546,87 @@ def chat_room(request, booking_id):
         else:
             messages.error(request, "Message cannot be empty.")
 
-    messages_list = booking.messages.select_related("sender").all()
+    # Only the latest page; older messages load on demand from chat_history
+    messages_list, has_earlier = history(booking.id)
     return render(request, "chat_room.html", {
         "booking": booking,
         "messages_list": messages_list,
+        "has_earlier": has_earlier,
         "is_driver": booking.driver == user,
         "is_customer": booking.ride_request.customer == user,
     })
 
 
+async def chat_poll(request, booking_id):
+    """Long-poll for messages newer than ?after=<id>.
+
+    Answers as soon as one exists, or with an empty list after POLL_TIMEOUT
+    seconds. The hub is subscribed before the database is checked, so a
+    message saved in between still wakes this request.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    try:
+        after = int(request.GET.get("after") or 0)
+    except ValueError:
+        return JsonResponse({"error": "after must be a message id."}, status=400)
+    booking = await Booking.objects.select_related("ride_request").filter(id=booking_id).afirst()
+    error = chat_access_error(booking, user)
+    if error:
+        return error
+
+    waiter = chat_hub.subscribe(booking.id)
+    try:
+        new_messages, has_more = await ahistory(booking.id, after=after)
+        if not new_messages and await chat_hub.wait(waiter, chat_setting("POLL_TIMEOUT")):
+            new_messages, has_more = await ahistory(booking.id, after=after)
+    finally:
+        chat_hub.unsubscribe(waiter)
+    return JsonResponse({"messages": [serialize_message(m) for m in new_messages], "has_more": has_more})
+
+
+@login_required
+def chat_history(request, booking_id):
+    """One page of messages as JSON: ?after=<id> for newer, ?before=<id> for older, neither for the latest."""
+    booking = Booking.objects.select_related("ride_request").filter(id=booking_id).first()
+    error = chat_access_error(booking, request.user)
+    if error:
+        return error
+    try:
+        after = int(request.GET["after"]) if "after" in request.GET else None
+        before = int(request.GET["before"]) if "before" in request.GET else None
+    except ValueError:
+        return JsonResponse({"error": "after and before must be message ids."}, status=400)
+    if after is not None and before is not None:
+        return JsonResponse({"error": "Give after or before, not both."}, status=400)
+    page, has_more = history(booking.id, after=after, before=before)
+    return JsonResponse({"messages": [serialize_message(m) for m in page], "has_more": has_more})
+
+
+@require_POST
+def chat_send(request, booking_id):
+    """Post a message without a page reload; takes JSON {"text": ..} or form data."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    booking = Booking.objects.select_related("ride_request").filter(id=booking_id).first()
+    error = chat_access_error(booking, request.user)
+    if error:
+        return error
+    if request.content_type == "application/json":
+        try:
+            text = json.loads(request.body).get("text")
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Invalid JSON."}, status=400)
+    else:
+        text = request.POST.get("text")
+    text = (text or "").strip() if isinstance(text, str) else ""
+    if not text:
+        return JsonResponse({"error": "Message cannot be empty."}, status=400)
+    message = ChatMessage.objects.create(booking=booking, sender=request.user, text=text)
+    return JsonResponse(serialize_message(message), status=201)
+
+
 # ===============================================================
 # ================ EMERGENCY SYSTEM =============================
 # ===============================================================
@@ -669,9 +722,10 @@ def update_location(request):
             # ✅ If driver, also update DriverProfile
             if request.user.role == "driver":
                 driver_profile, _ = DriverProfile.objects.get_or_create(user=request.user)
-                driver_profile.current_lat = lat
-                driver_profile.current_lng = lng
-                driver_profile.save(update_fields=["current_lat", "current_lng"])
+                driver_profile.move_to(lat, lng)
+                driver_profile.save(update_fields=["current_lat", "current_lng", "location_updated_at"])
+                bring_online(request.user.pk)
+                live_locations.update(request.user.pk, lat, lng)
 
             msg = "Authenticated user location updated"
         else:
@@ -684,7 +738,93 @@ def update_location(request):
         return redirect(next_url or "home")
 
 
+@require_POST
+def ingest_locations(request):
+    """JSON endpoint for app location pings; buffered and written in bulk.
+
+    Takes {"lat": .., "lng": ..} or {"pings": [{"lat", "lng", "ts"}, ...]} and
+    answers 204 without touching the session or flash messages.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required."}, status=401)
+    try:
+        lat, lng = parse_pings(json.loads(request.body))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    location_buffer.record(request.user, lat, lng)
+    return HttpResponse(status=204)
+
+
+def _driver_dashboard_context(request, profile):
+    """Everything driver_dashboard.html shows for this driver's profile; views adding to it start from this."""
+    # Template reads request.user.driverprofile; reuse the row the caller fetched
+    request.user.driverprofile = profile
+    bookings = paginate_request(
+        request, Booking.objects.filter(driver=request.user).select_related("ride_request"),
+        "confirmed_at", param="bookings_after",
+    )
+    stats, _ = DriverStats.objects.get_or_create(driver=request.user)
+    available = (
+        RideRequest.objects.filter(status="pending")
+        .exclude(booking__isnull=False)
+        .order_by("-created_at")[:20]
+    )
+    reviews = paginate_request(request, DriverReview.objects.filter(driver=request.user), "created_at", param="reviews_after")
+    avg_rating = stats.avg_rating
+    offers = (
+        RideOffer.objects.filter(driver=request.user, ride_request__status="pending")
+        .select_related("ride_request")
+        .order_by("distance_km")
+    )
+    nearby = []
+    if profile.current_lat is not None and profile.current_lng is not None:
+        nearby = cached_nearby_rides(request.user, profile.current_lat, profile.current_lng)
+
+    return {
+        "bookings": bookings,
+        "available_rides": available,
+        "nearby_rides": nearby,
+        "offers": offers,
+        "reviews": reviews,
+        "avg_rating": round(avg_rating or 0, 2) if avg_rating else None,
+        "total_completed": stats.completed_count,
+        "total_ongoing": stats.ongoing_count,
+        # Dashboard khola thakle online driver er position eto second por por pathano hoy
+        "ping_interval": location_setting("PING_INTERVAL"),
+    }
+
+
+@login_required
+@require_POST
+def set_availability(request):
+    """Driver's online/offline switch; a busy driver stays busy until the ongoing ride ends."""
+    if request.user.role != "driver":
+        return HttpResponseForbidden("Only drivers can change availability")
+    wanted = request.POST.get("availability")
+    if wanted not in ("online", "offline"):
+        messages.error(request, "Unknown availability.")
+        return redirect("driver_dashboard")
+    # Conditional update, jate eki somoy booking shuru hole busy ta overwrite na hoy
+    changed = (
+        DriverProfile.objects.filter(user=request.user)
+        .exclude(availability="busy")
+        .update(availability=wanted)
+    )
+    if not changed:
+        messages.info(request, "You have an ongoing ride; you can change availability once it ends.")
+        return redirect("driver_dashboard")
+    bump_etags(driver_scope(request.user.pk))
+    if wanted == "offline":
+        live_locations.remove(request.user.pk)
+        messages.info(request, "You are offline. Customers will not see you until you go online again.")
+    else:
+        messages.success(request, "You are online. Keep the dashboard open so your position stays current.")
+    return redirect("driver_dashboard")
+
+
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=driver_dashboard_etag)
 def driver_dashboard(request):
     if request.user.role != "driver":
         return redirect("customer_dashboard")
@@ -698,22 +838,4 @@ def driver_dashboard(request):
         messages.info(request, "Please complete your driver profile before accessing the dashboard.")
         return redirect("driver_profile")
 
-    bookings = Booking.objects.filter(driver=request.user).order_by("-confirmed_at")
-    total_completed = bookings.filter(status="completed").count()
-    total_ongoing = bookings.filter(status="ongoing").count()
-    available = (
-        RideRequest.objects.filter(status="pending")
-        .exclude(booking__isnull=False)
-        .order_by("-created_at")[:20]
-    )
-    reviews = DriverReview.objects.filter(driver=request.user).order_by("-created_at")
-    avg_rating = reviews.aggregate(avg=Avg("rating"))["avg"]
-
-    return render(request, "driver_dashboard.html", {
-        "bookings": bookings,
-        "available_rides": available,
-        "reviews": reviews,
-        "avg_rating": round(avg_rating or 0, 2) if avg_rating else None,
-        "total_completed": total_completed,
-        "total_ongoing": total_ongoing,
-    })
+    return render(request, "driver_dashboard.html", _driver_dashboard_context(request, profile))
@@ -16,5 +16,11 @@ class Note(models.Model):
 	created_at = models.DateTimeField(auto_now_add=True)
 	updated_at = models.DateTimeField(auto_now=True)
 
+	class Meta:
+		indexes = [
+			# Notes list and health dashboard: a user's notes, latest edit first
+			models.Index(fields=["user", "-updated_at"], name="note_user_updated_idx"),
+		]
+
 	def __str__(self):
 		return self.title
\ No newline at end of file